@@ -1,100 +1,39 @@
 # coding: utf-8
-import requests
+"""
+ASX unexpected-positive announcement scanner.
+
+The run is a pipeline of stages that can be called on their own:
+
+    content = fetch_page()                  # raw todayAnns.do page
+    rows = parse_page(content)              # announcement row dicts
+    ranked = score_announcements(rows)      # filters 1-6 + volume bonus, best first
+    top = enrich_announcements(ranked)      # PDF URLs + short interest for the top N
+    emit_outputs(top)                       # CSV, then the optional chart
+
+Importing this module has no side effects: requests, pandas/yfinance and
+matplotlib are only imported by the stages that need them, and the price
+store, fetcher, short-interest book and archive are created on first use.
+"""
+import argparse
 import time
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, time as dt_time
 import csv
-import matplotlib.pyplot as plt
+import os
 import re
+import threading
 from textwrap import wrap
-import pathlib
-import yfinance as yf
-
-# ASX announcement URL
-ASX_URL = "https://www.asx.com.au/asx/v2/statistics/todayAnns.do"
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-# PLACEHOLDER: Your ticker list (add your actual tickers here)
-TICKER_LIST = {
-    "ICN.AX", "RRL.AX", "GGAB.AX", "IFRA.AX", "HDN.AX", "IBAL.AX", "MVE.AX", "IBUY.AX", "AESG.AX", "GHHF.AX", "ALD.AX",
-    "WBC.AX", "JHGA.AX", "UMAX.AX", "AAC.AX", "XRO.AX", "IEAT.AX", "BNKS.AX", "EMXC.AX", "BNDS.AX", "ETPMPT.AX",
-    "QNDQ.AX", "BCI.AX", "PNI.AX", "GGOV.AX", "YAL.AX", "GNC.AX", "BUGG.AX", "LIC.AX", "CCP.AX", "NXG.AX",
-    "CFLO.AX", "GLPR.AX", "360.AX", "FAIR.AX", "FCAP.AX", "MTS.AX", "SGH.AX", "IZZ.AX", "IMU.AX", "FRGG.AX",
-    "TLC.AX", "NIC.AX", "ZIM.AX", "COF.AX", "IEL.AX", "DYL.AX", "HJPN.AX", "REH.AX", "PDI.AX", "MQDB.AX",
-    "PTM.AX", "CDA.AX", "ERTH.AX", "GOAT.AX", "SGM.AX", "IAF.AX", "IXJ.AX", "IFT.AX", "VEU.AX", "SOL.AX",
-    "LEND.AX", "DACE.AX", "NWS.AX", "CQE.AX", "LFS.AX", "VMIN.AX", "BILL.AX", "GMTL.AX", "DMP.AX", "NGI.AX",
-    "VBND.AX", "MMKT.AX", "EBO.AX", "BANK.AX", "ORI.AX", "JREG.AX", "CMW.AX", "USIG.AX", "PYC.AX", "FPH.AX",
-    "SIQ.AX", "BCOM.AX", "NUGG.AX", "ERA.AX", "SNAS.AX", "CAR.AX", "ETHI.AX", "EVN.AX", "LTR.AX", "RBTZ.AX",
-    "IAA.AX", "MVR.AX", "SSM.AX", "QYLD.AX", "CRN.AX", "IMLC.AX", "JIN.AX", "AMP.AX", "MVA.AX", "ZIP.AX",
-    "REA.AX", "AGVT.AX", "SNL.AX", "HYGG.AX", "RWC.AX", "OCL.AX", "ALTB.AX", "E200.AX", "IMPQ.AX", "SPR.AX",
-    "INIF.AX", "RIO.AX", "MCGG.AX", "US10.AX", "MGOC.AX", "IHWL.AX", "HGEN.AX", "OZF.AX", "TPG.AX", "EMMG.AX",
-    "IPAY.AX", "TLS.AX", "DCOR.AX", "CHN.AX", "ETPMPM.AX", "MQEG.AX", "VIF.AX", "UTIP.AX", "NXT.AX", "DAVA.AX",
-    "LKE.AX", "NEU.AX", "LNYN.AX", "EINC.AX", "A2M.AX", "GARP.AX", "IDX.AX", "HUB.AX", "WHC.AX", "KAR.AX",
-    "PNV.AX", "CKF.AX", "VCX.AX", "ADT.AX", "FANG.AX", "AUB.AX", "VAU.AX", "FBU.AX", "WIRE.AX", "CBO.AX",
-    "HGBL.AX", "CGHE.AX", "IPX.AX", "ACL.AX", "MOAT.AX", "NNWH.AX", "RGN.AX", "ISO.AX", "MKAX.AX", "STW.AX",
-    "QPON.AX", "WPR.AX", "NSR.AX", "BEN.AX", "KLS.AX", "ARMR.AX", "MHG.AX", "BOE.AX", "QMAX.AX", "JPEQ.AX",
-    "FPR.AX", "IKO.AX", "DBBF.AX", "SCG.AX", "AIA.AX", "BGA.AX", "BMN.AX", "MVB.AX", "ASX.AX", "EMKT.AX",
-    "CIP.AX", "TYR.AX", "CNEW.AX", "DGGF.AX", "C79.AX", "ASB.AX", "QOZ.AX", "WC8.AX", "DFGH.AX", "EDV.AX",
-    "GPT.AX", "GDG.AX", "DOW.AX", "AGL.AX", "BPT.AX", "GWA.AX", "SIG.AX",
-    "GIVE.AX", "ASK.AX", "ESPO.AX", "HBRD.AX", "QFN.AX", "MTAV.AX", "EX20.AX", "AD8.AX", "AAA.AX", "ADEF.AX", "GLIN.AX", "DVDY.AX", "GRNV.AX",
-    "MAQ.AX", "MND.AX", "SKUK.AX", "VBTC.AX", "LPGD.AX", "RSM.AX", "BBAB.AX", "HQLT.AX", "QHSM.AX", "IIND.AX",
-    "VSL.AX", "BHYB.AX", "BGBL.AX", "VBLD.AX", "PRU.AX", "MVW.AX", "ILB.AX", "AYLD.AX", "OOO.AX", "DVP.AX",
-    "PAXX.AX", "GOZ.AX", "BWP.AX", "INES.AX", "NDIA.AX", "PLUS.AX", "PMGOLD.AX", "PPC.AX", "QOR.AX", "WGX.AX",
-    "GOLD.AX", "GMG.AX", "GOR.AX", "WEB.AX", "CAT.AX", "FASI.AX", "MVOL.AX", "VACF.AX", "SEMI.AX", "VNT.AX",
-    "REIT.AX", "OZR.AX", "IHVV.AX", "VDGR.AX", "GPEQ.AX", "NEC.AX", "SMLL.AX", "GOVT.AX", "FFM.AX", "QRE.AX",
-    "GGUS.AX", "ING.AX", "CURE.AX", "JBH.AX", "VAS.AX", "OPT.AX", "IOO.AX", "IVV.AX", "SUBD.AX", "AZJ.AX",
-    "MEI.AX", "MCCL.AX", "NAB.AX", "ICOR.AX", "QUS.AX", "ASAO.AX", "ALL.AX", "XALG.AX", "IRE.AX", "VLUE.AX",
-    "BAP.AX", "CRYP.AX", "UNI.AX", "RUL.AX", "DAOR.AX", "SEK.AX", "ARU.AX", "MQG.AX", "ORA.AX", "FIIN.AX",
-    "SGP.AX", "CGF.AX", "TEA.AX", "PMT.AX", "PPT.AX", "GEAR.AX", "PMV.AX", "NVX.AX", "FOOD.AX", "PAC.AX",
-    "IHHY.AX", "ALQ.AX", "IFM.AX", "SLX.AX", "QBE.AX", "BAOR.AX", "LOV.AX", "CLDD.AX", "CUV.AX", "BGL.AX",
-    "IMM.AX", "DGVA.AX", "ESGI.AX", "AX1.AX", "MICH.AX", "NDQ.AX", "TPW.AX", "NNUK.AX", "ZYAU.AX", "VAE.AX",
-    "MNRS.AX", "HETH.AX", "QUB.AX", "CBA.AX", "DDR.AX", "FLT.AX", "SRG.AX", "EVT.AX", "SUN.AX", "DBI.AX",
-    "U100.AX", "TLX.AX", "NWL.AX", "DXI.AX", "BXB.AX", "ORG.AX", "XCO2.AX", "BSL.AX", "VEA.AX", "WDIV.AX",
-    "IWLD.AX", "FUEL.AX", "GAME.AX", "BOND.AX", "DGSM.AX", "VHY.AX", "BRE.AX", "VVLU.AX", "PRN.AX", "AOV.AX",
-    "QRI.AX", "MQAE.AX", "L1HI.AX", "VCF.AX", "WXOZ.AX", "USD.AX", "TUA.AX", "RGB.AX", "YMAX.AX", "SYA.AX",
-    "AUST.AX", "IHD.AX", "IHEB.AX", "LNAS.AX", "VEQ.AX", "IVE.AX", "IEM.AX", "WEMG.AX", "ACDC.AX", "GEM.AX",
-    "APA.AX", "CETF.AX", "UOS.AX", "GBND.AX", "STX.AX", "MAET.AX", "5GOV.AX", "WCMQ.AX", "INR.AX", "JHLO.AX",
-    "IISV.AX", "MIN.AX", "MSTR.AX", "SRV.AX", "ROYL.AX", "QAU.AX", "DTL.AX", "RCB.AX", "MFOA.AX", "EIGA.AX",
-    "RFF.AX", "IXI.AX", "MHOT.AX", "NAN.AX", "INCM.AX", "VLC.AX", "IAG.AX", "IGO.AX", "IMD.AX", "G200.AX",
-    "QUAL.AX", "PDN.AX", "QAL.AX", "PIXX.AX", "ITEK.AX", "MSB.AX", "MAC.AX", "RINC.AX", "PLS.AX", "ZYUS.AX",
-    "SMR.AX", "CTD.AX", "VGB.AX", "OZBD.AX", "SVNP.AX", "SGLLV.AX", "DHHF.AX", "BOQ.AX", "HMC.AX", "VGE.AX",
-    "1GOV.AX", "OBM.AX", "QLTY.AX", "WOR.AX", "ETPMAG.AX", "WOW.AX", "JEGA.AX", "MVS.AX", "TNE.AX", "INA.AX",
-    "YANK.AX", "CVL.AX", "FHCO.AX", "AUMF.AX", "ANN.AX", "MAH.AX", "ANZ.AX", "TCL.AX", "WA1.AX", "ROBO.AX",
-    "ATEC.AX", "BVS.AX", "GDX.AX", "GLDN.AX", "XARO.AX", "MAAT.AX", "PGC.AX", "DHG.AX", "CSC.AX", "MYS.AX",
-    "RMS.AX", "S3GO.AX", "GNDQ.AX", "IOZ.AX", "ASIA.AX", "GCO2.AX", "PAVE.AX", "SGR.AX", "MAD.AX", "IEU.AX",
-    "ATOM.AX", "SFY.AX", "ULTB.AX", "XMET.AX", "IJH.AX", "VETH.AX", "VNGS.AX", "STO.AX", "BSUB.AX", "CWY.AX",
-    "GROW.AX", "RPL.AX", "WDMF.AX", "BBUS.AX", "DJRE.AX", "OFX.AX", "IJP.AX", "ILC.AX", "PME.AX", "F100.AX",
-    "HEUR.AX", "FUTR.AX", "IHCB.AX", "MGR.AX", "OZXX.AX", "DXS.AX", "VEFI.AX", "HJZP.AX", "RCAP.AX", "NST.AX",
-    "SWTZ.AX", "GXLD.AX", "BBFD.AX", "AGX1.AX", "PNR.AX", "CYL.AX", "JRHG.AX", "IUSG.AX", "BHP.AX", "DFND.AX",
-    "DRIV.AX", "VGAD.AX", "AUDS.AX", "HLI.AX", "CIA.AX", "BC8.AX", "MMS.AX", "NXL.AX", "VDHG.AX", "HHIF.AX",
-    "NHF.AX", "USTB.AX", "HCW.AX", "GGFD.AX", "WDS.AX", "ESTX.AX", "SFR.AX", "JEPI.AX", "AQLT.AX", "EAFZ.AX",
-    "LSGE.AX", "IFL.AX", "ARB.AX", "SUL.AX", "EMR.AX", "AEBD.AX", "ALX.AX", "CHC.AX", "EDOC.AX", "WRLD.AX",
-    "WVOL.AX", "LYC.AX", "SKC.AX", "WXHG.AX", "MGH.AX", "ISEC.AX", "BRG.AX", "RARI.AX", "NCK.AX", "SPK.AX",
-    "ARF.AX", "IJR.AX", "BLX.AX", "HCRD.AX", "MPL.AX", "NHC.AX", "APE.AX", "IGB.AX", "IPH.AX", "RGOS.AX",
-    "PFP.AX", "RHC.AX", "GCAP.AX", "CU6.AX", "EBND.AX", "MOGL.AX", "USHY.AX", "CMM.AX", "QMIX.AX", "MTUM.AX",
-    "JHX.AX", "CSL.AX", "MYX.AX", "JNDQ.AX", "VAP.AX", "RMD.AX", "LLC.AX", "GMVW.AX", "UYLD.AX", "QHAL.AX",
-    "JGLO.AX", "URNM.AX", "WES.AX", "HSN.AX", "AASF.AX", "JDO.AX", "VISM.AX", "ILU.AX", "ISLM.AX", "WAF.AX",
-    "JHPI.AX", "VTS.AX", "DHOF.AX", "MQWS.AX", "MP1.AX", "RDV.AX", "HVN.AX", "MAF.AX", "SYI.AX", "BRN.AX",
-    "TBIL.AX", "LFG.AX", "MQIO.AX", "GYG.AX", "ETPMPD.AX", "SDR.AX", "RIC.AX", "TECH.AX", "QAN.AX", "GLOB.AX",
-    "VAF.AX", "BKW.AX", "CTT.AX", "VESG.AX", "CGUN.AX", "VGS.AX", "DRR.AX", "XASG.AX", "MFG.AX", "MHHT.AX",
-    "SHV.AX", "CRED.AX", "DZZF.AX", "IYLD.AX", "NUF.AX", "S32.AX", "KLS.AX", "DGCE.AX", "JLG.AX", "IIGF.AX",
-    "HJZP.AX", "IPG.AX", "WBT.AX", "CNI.AX", "VDBA.AX", "SDF.AX", "GMD.AX", "RDX.AX", "T3MP.AX", "MYR.AX",
-    "EQT.AX", "COL.AX", "VSO.AX", "BOT.AX", "DRUG.AX", "CQR.AX", "HLTH.AX", "URW.AX", "PXA.AX", "SSO.AX",
-    "HACK.AX", "HVST.AX", "ABG.AX", "IGRO.AX", "L1IF.AX", "MVF.AX", "FRAR.AX", "FLOT.AX", "WTC.AX", "SPY.AX",
-    "NWH.AX", "VUL.AX", "A200.AX", "A4N.AX", "REG.AX", "FHNG.AX", "TAH.AX", "BEAR.AX", "CPU.AX", "H100.AX",
-    "CLW.AX", "RSG.AX", "FSML.AX", "COH.AX", "ABB.AX", "FMG.AX", "DRO.AX", "JZRO.AX", "TWE.AX", "XGOV.AX",
-    "PPM.AX", "IESG.AX", "OML.AX", "AEF.AX", "TANN.AX", "FEMX.AX", "SLF.AX", "BTXX.AX", "CLNE.AX", "SLC.AX",
-    "SHL.AX", "KGN.AX", "HQUS.AX", "GXAI.AX", "HNDQ.AX", "QSML.AX", "VDCO.AX", "BBOZ.AX", "IHOO.AX", "HVLU.AX",
-    "APX.AX", "PWH.AX", "ELD.AX", "HLS.AX", "DTEC.AX"
-}
+from html import escape
+from asx_announcements import SNAPSHOT_DIR, SYDNEY_TZ, fetch_announcements_page, parse_announcements
+from keyword_matcher import KeywordMatcher
+from ticker_universe import load_universe
 
-# Biotech/Healthcare tickers to EXCLUDE (too volatile)
-BIOTECH_EXCLUDE = {
-    "IMU.AX", "PYC.AX", "NEU.AX", "CSL.AX", "RMD.AX", "COH.AX", "SHL.AX", 
-    "RHC.AX", "CPU.AX", "DRR.AX", "BOT.AX", "CURE.AX", "DRUG.AX", "HLTH.AX"
-    # Add more biotech/pharma tickers as needed
-}
+# Number of top-scoring announcements to enrich and write to the CSV
+TOP_N = 5
+
+# Watchlist from value.csv; the biotech/healthcare tickers are excluded (too volatile)
+UNIVERSE = load_universe()
+TICKER_LIST = UNIVERSE.tickers_ax
+BIOTECH_EXCLUDE = UNIVERSE.biotech_ax
 
 # Enhanced keywords focusing on UNEXPECTED POSITIVE results
 SURPRISE_KEYWORDS = {
@@ -242,24 +181,89 @@ BEARISH_KEYWORDS = {
 
 NEGATION_WORDS = {"not", "no", "never", "none"}
 
-
-def check_volume_buildup(ticker_ax):
+# Every keyword table compiled once into a single automaton
+KEYWORD_MATCHER = KeywordMatcher({
+    "surprise": SURPRISE_KEYWORDS,
+    "bullish": BULLISH_KEYWORDS,
+    "bearish": BEARISH_KEYWORDS,
+    "routine": ROUTINE_ANNOUNCEMENTS,
+    "biotech": BIOTECH_KEYWORDS,
+})
+SENTIMENT_CATEGORIES = {"surprise", "bullish", "bearish"}
+
+# Per-filter counters reported by score_announcements(stats=...), in filter order
+FILTER_STAGES = ("rows", "not_watchlist", "biotech_ticker", "not_price_sensitive",
+                 "routine", "biotech_content", "non_positive", "qualified")
+
+
+# Shared resources, created on first use so importing N2 stays cheap
+_PRICE_STORE = None
+_FETCHER = None
+_SHORT_BOOK = None
+_ARCHIVE = None
+
+def get_price_store():
+    """Local OHLCV store, topped up with one delta download per run"""
+    global _PRICE_STORE
+    if _PRICE_STORE is None:
+        from price_store import PriceStore
+        _PRICE_STORE = PriceStore()
+    return _PRICE_STORE
+
+def get_fetcher():
+    """Shared fetcher: landing pages resolve concurrently within per-host limits"""
+    global _FETCHER
+    if _FETCHER is None:
+        from fetch_engine import HostAwareFetcher
+        _FETCHER = HostAwareFetcher()
+    return _FETCHER
+
+def get_short_book():
+    """Market-wide short positions, loaded once per run from the daily ASIC report"""
+    global _SHORT_BOOK
+    if _SHORT_BOOK is None:
+        from short_interest import ShortInterestBook
+        _SHORT_BOOK = ShortInterestBook()
+    return _SHORT_BOOK
+
+def get_archive():
+    """Local archive of every announcement row seen"""
+    global _ARCHIVE
+    if _ARCHIVE is None:
+        from announcement_archive import AnnouncementArchive
+        _ARCHIVE = AnnouncementArchive()
+    return _ARCHIVE
+
+
+def check_volume_buildups(tickers_ax, as_of=None):
     """
-    Returns ratio of 3-day avg volume vs 20-day avg volume.
+    Returns {ticker: ratio of 3-day avg volume vs 20-day avg volume} for every
+    ticker, read from the local price store in one query.
     > 1.5 suggests institutional accumulation before announcement.
+    as_of (a date) uses only bars before that day, for historical replay.
     """
+    tickers_ax = sorted(set(tickers_ax))
+    ratios = {ticker: 0.0 for ticker in tickers_ax}
+    if not tickers_ax:
+        return ratios
+
     try:
-        stock = yf.Ticker(ticker_ax)
-        hist = stock.history(period="1mo")
-        if len(hist) < 10:
-            return 0.0
-        avg_vol_20 = hist['Volume'].iloc[:-3].mean()
-        avg_vol_3 = hist['Volume'].iloc[-3:].mean()
-        if avg_vol_20 <= 0:
-            return 0.0
-        return round(avg_vol_3 / avg_vol_20, 2)
+        volume = get_price_store().panel(tickers_ax, "Volume", days=31, until=as_of)
     except Exception:
-        return 0.0
+        return ratios
+    if volume.empty:
+        return ratios
+
+    # Rows are aligned across tickers, so count each ticker's own bars from the end
+    valid = volume.notna()
+    bars_from_end = valid[::-1].cumsum()[::-1]
+    avg_vol_3 = volume.where(valid & (bars_from_end <= 3)).mean()
+    avg_vol_20 = volume.where(valid & (bars_from_end > 3)).mean()
+
+    ratio = (avg_vol_3 / avg_vol_20).round(2)
+    ratio = ratio.where((valid.sum() >= 10) & (avg_vol_20 > 0), 0.0).fillna(0.0)
+    ratios.update({ticker: float(value) for ticker, value in ratio.items()})
+    return ratios
 
 
 # PDF URL scraping functions
@@ -267,56 +271,10 @@ HEADERS_PDF = {
     'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0'
 }
 
-def first_scrape():
-    """Get all announcement data including titles for PDF URL matching"""
-    my_url = "https://www.asx.com.au/asx/v2/statistics/todayAnns.do"
-    req = requests.get(my_url, headers=HEADERS_PDF)
-    if req.status_code != 200:
-        print(f"Failed to load page, status code {req.status_code}")
-        return []
-
-    page_soup = BeautifulSoup(req.content, 'html.parser')
-    link_form = "/asx/v2/statistics/displayAnnouncement.do?display=pdf&idsId="
-    announcement_data = []
-
-    table = page_soup.find("table")
-    if not table:
-        return []
-
-    for tr in table.find_all('tr')[1:]:  # Skip header
-        tds = tr.find_all('td')
-        if len(tds) < 4:
-            continue
-
-        ticker = tds[0].text.strip().upper()
-
-        # Extract title for matching
-        title_cell = tds[3]
-        full_title_text = title_cell.get_text(separator=" ", strip=True)
-        title = re.sub(r'\d+\s+pages?\s+\d+\.?\d*KB$', '', full_title_text).strip()
-
-        # Get PDF link
-        a_tag = tds[3].find('a', href=True)
-        if not a_tag:
-            continue
-
-        href_raw = a_tag['href']
-        href_clean = href_raw.replace('\n', '').replace('\r', '').replace(' ', '')
-
-        if link_form in href_clean:
-            full_url = 'https://www.asx.com.au' + href_clean
-            announcement_data.append({
-                'ticker': ticker,
-                'title': title,
-                'landing_url': full_url
-            })
-
-    return announcement_data
-
 def get_pdf_url_from_landing_page(landing_url):
     """Extract the actual PDF URL from a landing page"""
     try:
-        response = requests.get(landing_url, headers=HEADERS_PDF)
+        response = get_fetcher().get(landing_url, headers=HEADERS_PDF)
         if response.status_code != 200:
             return None
 
@@ -330,94 +288,57 @@ def get_pdf_url_from_landing_page(landing_url):
         return None
 
 def get_pdf_urls_for_announcements(announcements):
-    """Get PDF URLs that match specific announcements"""
+    """Resolve PDF URLs from the landing pages captured in the snapshot"""
     print("\n--- Getting PDF URLs for announcements ---")
-    all_announcement_data = first_scrape()
     pdf_urls = {}
 
+    # Announcements resolved on an earlier pass (watch mode) keep their "pdf_url"
+    pending = [ann for ann in announcements if ann.get("landing_url") and "pdf_url" not in ann]
+    for ann, pdf_url in zip(pending, get_fetcher().map(get_pdf_url_from_landing_page, [ann["landing_url"] for ann in pending])):
+        ann["pdf_url"] = pdf_url
+
     for ann in announcements:
         ticker = ann["ticker"]
         title = ann["title"]
 
-        matching_data = None
-        for data in all_announcement_data:
-            if (data['ticker'] == ticker and 
-                similar_titles(data['title'], title)):
-                matching_data = data
-                break
-
-        if matching_data:
-            print(f"Getting PDF URL for {ticker}: {title[:50]}...")
-            pdf_url = get_pdf_url_from_landing_page(matching_data['landing_url'])
+        if ann.get("landing_url"):
+            print(f"PDF URL for {ticker}: {title[:50]}...")
+            pdf_url = ann["pdf_url"]
             if pdf_url:
                 pdf_urls[f"{ticker}_{title}"] = pdf_url
                 print(f"  Found: {pdf_url}")
             else:
                 print(f"  No PDF URL found")
         else:
-            print(f"No matching announcement found for {ticker}: {title[:50]}...")
+            print(f"No landing page link for {ticker}: {title[:50]}...")
 
     return pdf_urls
 
-def similar_titles(title1, title2, threshold=0.8):
-    """Check if two titles are similar enough"""
-    words1 = set(title1.lower().split())
-    words2 = set(title2.lower().split())
-
-    if not words1 or not words2:
-        return False
-
-    intersection = len(words1.intersection(words2))
-    union = len(words1.union(words2))
-
-    return intersection / union >= threshold
-
-def parse_announcement_datetime(date_time_str):
-    formats_to_try = [
-        "%d/%m/%Y %I:%M %p",
-        "%d/%m/%Y %H:%M",
-        "%d/%m/%Y\n%I:%M %p",
-        "%d/%m/%Y\n%H:%M",
-    ]
-
-    for fmt in formats_to_try:
-        try:
-            dt = datetime.strptime(date_time_str, fmt)
-            return pytz.timezone("Australia/Sydney").localize(dt)
-        except ValueError:
-            continue
-    return None
-
-def is_routine_announcement(title):
+def is_routine_announcement(title, hits=None):
     """Check if announcement is routine/expected"""
-    title_lower = title.lower()
-    return any(phrase in title_lower for phrase in ROUTINE_ANNOUNCEMENTS)
+    if hits is None:
+        hits = KEYWORD_MATCHER.find(title)
+    return any(category == "routine" for category, _, _ in hits)
 
-def is_biotech_related(title):
+def is_biotech_related(title, hits=None):
     """Check if announcement contains biotech-related keywords"""
-    title_lower = title.lower()
-    return any(keyword in title_lower for keyword in BIOTECH_KEYWORDS)
+    if hits is None:
+        hits = KEYWORD_MATCHER.find(title)
+    return any(category == "biotech" for category, _, _ in hits)
 
-def calculate_sentiment_score(title):
+def calculate_sentiment_score(title, hits=None, verbose=True):
     """Enhanced sentiment calculation focusing on surprise factor"""
     title_lower = title.lower()
+    if hits is None:
+        hits = KEYWORD_MATCHER.find(title)
     score = 0.0
 
-    # Check SURPRISE keywords first (highest priority)
-    for phrase, weight in SURPRISE_KEYWORDS.items():
-        if phrase in title_lower:
-            score += weight
-            print(f"  SURPRISE match: '{phrase}' (+{weight})")
-
-    # Check regular bullish keywords
-    for phrase, weight in BULLISH_KEYWORDS.items():
-        if phrase in title_lower:
-            score += weight
-
-    # Check bearish keywords
-    for phrase, weight in BEARISH_KEYWORDS.items():
-        if phrase in title_lower:
+    # Phrase weights: hits come back in table order, SURPRISE first
+    for category, phrase, weight in hits:
+        if category in SENTIMENT_CATEGORIES:
             score += weight
+            if category == "surprise" and verbose:
+                print(f"  SURPRISE match: '{phrase}' (+{weight})")
 
     # Word-level analysis with negation
     words = re.findall(r'\b\w+\b', title_lower)
@@ -438,207 +359,163 @@ def calculate_sentiment_score(title):
 
     return round(score, 2)
 
-def get_short_interest(ticker):
-    """Get current short interest percentage for a ticker"""
-    clean_ticker = ticker.replace('.AX', '')
-    url = f"https://www.shortman.com.au/stock?q={clean_ticker}"
-
-    try:
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
-            return "N/A"
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        short_td = soup.find('td', class_='ca')
-        if short_td:
-            short_text = short_td.get_text(strip=True)
-            short_percentage = short_text.replace('%', '').strip()
-            return f"{short_percentage}%"
-        else:
-            return "N/A"
-
-    except Exception as e:
-        print(f"Error getting short data for {ticker}: {e}")
-        return "N/A"
+def score_titles(titles):
+    """
+    Batch entry point for a column of titles or PDF bodies: one automaton pass
+    per distinct text. Returns a dict per text with routine, biotech and
+    sentiment_score.
+    """
+    titles = [str(title) for title in titles]
+    results = []
+    for title, hits in zip(titles, KEYWORD_MATCHER.find_many(titles)):
+        results.append({
+            "routine": is_routine_announcement(title, hits),
+            "biotech": is_biotech_related(title, hits),
+            "sentiment_score": calculate_sentiment_score(title, hits, verbose=False),
+        })
+    return results
 
 def get_short_interest_for_announcements(announcements):
-    """Get short interest data for announcement tickers"""
+    """Get short interest data for announcement tickers from the daily snapshot"""
     print("\n--- Getting short interest data ---")
+    short_book = get_short_book()
+    report_date = short_book.ensure_loaded()
+    print(f"Short position report: {report_date or 'unavailable'}")
     short_data = {}
 
-    unique_tickers = set()
-    for ann in announcements:
-        unique_tickers.add(ann["ticker"] + ".AX")
-
-    for ticker in unique_tickers:
-        print(f"Getting short interest for {ticker}...")
-        short_interest = get_short_interest(ticker)
-        short_data[ticker] = short_interest
-        print(f"  {ticker}: {short_interest}")
-        time.sleep(0.5)
+    for ticker in sorted({ann["ticker"] + ".AX" for ann in announcements}):
+        short_data[ticker] = short_book.format(ticker)
+        change = short_book.change(ticker)
+        change_str = f" ({change:+.2f} pts)" if change is not None else ""
+        print(f"  {ticker}: {short_data[ticker]}{change_str}")
 
     return short_data
 
-# Main execution
-print("=" * 80)
-print("ASX SENTIMENT ANALYZER - FILTERING FOR UNEXPECTED POSITIVE RESULTS")
-print("=" * 80)
-print(f"\nFetching from URL: {ASX_URL}")
-response = requests.get(ASX_URL, headers=HEADERS)
-print(f"Response status code: {response.status_code}")
-
-soup = BeautifulSoup(response.text, "html.parser")
-table = soup.find("table")
-
-announcements = []
-
-if table:
-    for tr in table.find_all("tr")[1:]:  # Skip header row
-        tds = tr.find_all("td")
-        if len(tds) < 4:
-            continue
-
-        ticker = tds[0].text.strip()
+def score_announcements(rows, stats=None, verbose=True, as_of=None):
+    """
+    Score stage: run filters 1-6, sentiment scoring and the volume-buildup
+    bonus over parsed announcement rows. Returns the qualifying announcements,
+    best first. If stats is a dict, the number of rows dropped at each filter
+    is added to it. as_of (a date) scores volume as it stood before that day.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    counts = dict.fromkeys(FILTER_STAGES, 0)
+    announcements = []
+    candidates = []
+
+    for row in rows:
+        counts["rows"] += 1
+        ticker = row["ticker"]
         full_ticker = ticker + ".AX"
 
         # Filter 1: Must be in ticker list
         if full_ticker not in TICKER_LIST:
+            counts["not_watchlist"] += 1
             continue
 
         # Filter 2: Exclude biotech stocks
         if full_ticker in BIOTECH_EXCLUDE:
-            print(f"Excluding biotech: {full_ticker}")
+            counts["biotech_ticker"] += 1
+            log(f"Excluding biotech: {full_ticker}")
             continue
 
         # Filter 3: Must be price-sensitive
-        if not tds[2].find("img", alt="asterix"):
+        if not row["price_sensitive"]:
+            counts["not_price_sensitive"] += 1
             continue
 
-        # Extract date/time
-        date_cell = tds[1]
-        date_lines = [line.strip() for line in date_cell.stripped_strings]
-        if len(date_lines) >= 2:
-            date_time_str = f"{date_lines[0]} {date_lines[1]}"
-        elif len(date_lines) == 1:
-            date_time_str = date_lines[0]
-        else:
-            date_time_str = ""
-
-        date_time = parse_announcement_datetime(date_time_str)
+        date_time = row["date_time"]
+        title = row["title"]
 
-        # Extract and clean title
-        title_cell = tds[3]
-        full_title_text = title_cell.get_text(separator=" ", strip=True)
-        title = re.sub(r'\d+\s+pages?\s+\d+\.?\d*KB$', '', full_title_text).strip()
+        hits = KEYWORD_MATCHER.find(title)
 
         # Filter 4: Exclude routine announcements
-        if is_routine_announcement(title):
-            print(f"Excluding routine: {ticker} - {title[:50]}")
+        if is_routine_announcement(title, hits):
+            counts["routine"] += 1
+            log(f"Excluding routine: {ticker} - {title[:50]}")
             continue
 
         # Filter 5: Exclude biotech-related content
-        if is_biotech_related(title):
-            print(f"Excluding biotech content: {ticker} - {title[:50]}")
+        if is_biotech_related(title, hits):
+            counts["biotech_content"] += 1
+            log(f"Excluding biotech content: {ticker} - {title[:50]}")
             continue
 
         # Calculate sentiment
-        print(f"\nAnalyzing: {ticker} - {title}")
-        score = calculate_sentiment_score(title)
+        log(f"\nAnalyzing: {ticker} - {title}")
+        score = calculate_sentiment_score(title, hits, verbose=verbose)
 
-        # Check for pre-announcement volume buildup (institutional accumulation signal)
-        vol_buildup = check_volume_buildup(full_ticker)
+        candidates.append({
+            "ticker": ticker,
+            "title": title,
+            "date_time": date_time,
+            "sentiment_score": score,
+            "landing_url": row["landing_url"]
+        })
+
+    # Check for pre-announcement volume buildup (institutional accumulation signal)
+    # for every candidate in one price-store query
+    log(f"\n--- Checking volume buildup for {len(candidates)} candidates ---")
+    vol_buildups = check_volume_buildups((ann["ticker"] + ".AX" for ann in candidates), as_of=as_of)
+
+    for ann in candidates:
+        ticker = ann["ticker"]
+        score = ann["sentiment_score"]
+        vol_buildup = vol_buildups[ticker + ".AX"]
         if vol_buildup >= 2.0:
             score += 2.0
-            print(f"  Volume buildup bonus: {vol_buildup}x avg volume (+2.0)")
+            log(f"  {ticker} volume buildup bonus: {vol_buildup}x avg volume (+2.0)")
         elif vol_buildup >= 1.5:
             score += 1.0
-            print(f"  Volume buildup bonus: {vol_buildup}x avg volume (+1.0)")
+            log(f"  {ticker} volume buildup bonus: {vol_buildup}x avg volume (+1.0)")
 
         score = round(score, 2)
-        print(f"  Final score: {score}  |  Volume buildup: {vol_buildup}x")
+        log(f"  {ticker} final score: {score}  |  Volume buildup: {vol_buildup}x")
 
         # Filter 6: Only include positive sentiment
         if score <= 0:
-            print(f"  Excluding: non-positive sentiment")
+            counts["non_positive"] += 1
+            log(f"  Excluding {ticker}: non-positive sentiment")
             continue
 
-        announcements.append({
-            "ticker": ticker,
-            "title": title,
-            "date_time": date_time,
-            "sentiment_score": score,
-            "volume_buildup": vol_buildup
-        })
-
-else:
-    print("No announcements table found.")
-
-# Sort by sentiment score and take TOP 5 ONLY
-announcements.sort(key=lambda x: x["sentiment_score"], reverse=True)
-top_announcements = announcements[:5]  # LIMIT TO 5
+        ann["sentiment_score"] = score
+        ann["volume_buildup"] = vol_buildup
+        announcements.append(ann)
 
-print("\n" + "=" * 80)
-print(f"FOUND {len(announcements)} POSITIVE ANNOUNCEMENTS")
-print(f"OUTPUTTING TOP {len(top_announcements)} TO CSV")
-print("=" * 80)
+    counts["qualified"] = len(announcements)
+    if stats is not None:
+        for stage, count in counts.items():
+            stats[stage] = stats.get(stage, 0) + count
 
-for i, ann in enumerate(top_announcements, 1):
-    print(f"{i}. {ann['ticker']}: {ann['title']} (Score: {ann['sentiment_score']})")
+    announcements.sort(key=lambda x: x["sentiment_score"], reverse=True)
+    return announcements
 
-# Get PDF URLs and short interest for top 5 only
-if top_announcements:
-    pdf_urls = get_pdf_urls_for_announcements(top_announcements)
-    short_interest_data = get_short_interest_for_announcements(top_announcements)
-else:
-    pdf_urls = {}
-    short_interest_data = {}
-
-# CSV writing section - TOP 5 ONLY
-today_str = datetime.now(pytz.timezone("Australia/Sydney")).strftime("%Y%m%d")
-csv_filename = f"bullish_announcements_{today_str}.csv"
-
-with open(csv_filename, "w", newline="", encoding="utf-8") as f:
-    fieldnames = ["rank", "date_time", "ticker", "pdf_url", "short_interest", "ChangePct", "title", "sentiment_score", "volume_buildup"]
-    writer = csv.DictWriter(f, fieldnames=fieldnames)
-    writer.writeheader()
-
-    for idx, ann in enumerate(top_announcements, start=1):
-        ticker = ann["ticker"]
-        title = ann["title"]
-        full_ticker = ticker + ".AX"
-        short_interest = short_interest_data.get(full_ticker, "N/A")
-
-        pdf_key = f"{ticker}_{title}"
-        pdf_url = pdf_urls.get(pdf_key, "No PDF URL found")
-
-        formula = f'=GOOGLEFINANCE("ASX:" & C{idx+1}, "changepct")'
-
-        writer.writerow({
-            "rank": idx,
-            "date_time": ann["date_time"].strftime("%d/%m/%Y %H:%M") if ann["date_time"] else "N/A",
-            "ticker": ticker,
-            "pdf_url": pdf_url,
-            "short_interest": short_interest,
-            "ChangePct": formula,
-            "title": title,
-            "sentiment_score": ann["sentiment_score"],
-            "volume_buildup": ann.get("volume_buildup", 0)
-        })
+CHART_FORMATS = ("png", "svg", "html", "none")
+# Headless CI runs skip the chart unless N2_CHART asks for one
+DEFAULT_CHART = os.getenv("N2_CHART", "none" if os.getenv("GITHUB_ACTIONS") else "png")
 
-print(f"\n✓ Saved CSV file: {csv_filename}")
-
-# Generate chart for top 5
-if top_announcements:
+def chart_labels(top_announcements):
     labels = [f"{a['ticker']} (score:{a['sentiment_score']} vol:{a.get('volume_buildup',0)}x): {a['title']}" for a in top_announcements]
     scores = [a["sentiment_score"] for a in top_announcements]
     date_times = [f"{a['date_time'].strftime('%H:%M') if a['date_time'] else ''}" for a in top_announcements]
+    return labels, scores, date_times
+
+def chart_title(top_announcements):
+    return f"Top {len(top_announcements)} Unexpected Positive ASX Announcements - {datetime.now(SYDNEY_TZ).strftime('%d/%m/%Y')}"
+
+def render_png_chart(top_announcements, filename, dpi=300):
+    """matplotlib bar chart; matplotlib is only imported when a PNG is requested"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels, scores, date_times = chart_labels(top_announcements)
 
     plt.figure(figsize=(16, 10))
     bars = plt.barh(labels, scores, color='green')
     plt.gca().invert_yaxis()
     plt.xlabel("Sentiment Score", fontsize=12, fontweight='bold')
-    plt.title(f"Top 5 Unexpected Positive ASX Announcements - {datetime.now(pytz.timezone('Australia/Sydney')).strftime('%d/%m/%Y')}", 
-              fontsize=14, fontweight='bold')
+    plt.title(chart_title(top_announcements), fontsize=14, fontweight='bold')
 
     # Wrap long labels
     for i, label in enumerate(plt.gca().get_yticklabels()):
@@ -653,13 +530,272 @@ if top_announcements:
                  date_time_str.strip(), va='center', fontsize=9, weight='bold')
 
     plt.tight_layout()
-    png_filename = f"sentiment_chart_{today_str}.png"
-    plt.savefig(png_filename, bbox_inches='tight', dpi=300)
+    plt.savefig(filename, bbox_inches='tight', dpi=dpi)
     plt.close()
-    print(f"✓ Saved chart file: {png_filename}")
-else:
-    print("\nNo qualifying announcements found.")
 
-print("\n" + "=" * 80)
-print("ANALYSIS COMPLETE")
-print("=" * 80)
\ No newline at end of file
+def build_svg_chart(top_announcements):
+    """Dependency-free horizontal bar chart as an SVG string"""
+    labels, scores, date_times = chart_labels(top_announcements)
+    label_width, bar_width, row_height, top = 560, 520, 70, 60
+    width = label_width + bar_width + 80
+    height = top + row_height * len(labels) + 50
+    max_score = max(max(scores), 1)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{width / 2}" y="30" font-size="16" font-weight="bold" text-anchor="middle">{escape(chart_title(top_announcements))}</text>',
+    ]
+    for i, (label, score, date_time_str) in enumerate(zip(labels, scores, date_times)):
+        y = top + i * row_height
+        length = bar_width * score / max_score
+        lines = wrap(label, 70)[:3]
+        for j, line in enumerate(lines):
+            line_y = y + row_height / 2 + (j - (len(lines) - 1) / 2) * 13 + 4
+            parts.append(f'<text x="{label_width - 10}" y="{line_y:.1f}" font-size="11" text-anchor="end">{escape(line)}</text>')
+        parts.append(f'<rect x="{label_width}" y="{y + 10}" width="{length:.1f}" height="{row_height - 20}" fill="green"/>')
+        parts.append(f'<text x="{label_width + length + 6:.1f}" y="{y + row_height / 2 + 4}" font-size="11" font-weight="bold">{escape(date_time_str.strip())}</text>')
+    axis_y = top + row_height * len(labels)
+    parts.append(f'<line x1="{label_width}" y1="{axis_y}" x2="{label_width + bar_width}" y2="{axis_y}" stroke="black"/>')
+    parts.append(f'<text x="{label_width + bar_width / 2}" y="{axis_y + 30}" font-size="12" font-weight="bold" text-anchor="middle">Sentiment Score</text>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+def render_chart(top_announcements, today_str, fmt=DEFAULT_CHART):
+    """Write the chart for the top announcements in the requested format and return its filename"""
+    filename = f"sentiment_chart_{today_str}.{fmt}"
+    if fmt == "png":
+        render_png_chart(top_announcements, filename)
+    elif fmt == "svg":
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(build_svg_chart(top_announcements))
+    elif fmt == "html":
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{escape(chart_title(top_announcements))}</title></head>"
+                    f"<body>\n{build_svg_chart(top_announcements)}\n</body></html>\n")
+    else:
+        raise ValueError(f"Unknown chart format: {fmt}")
+    return filename
+
+def fetch_page(snapshot_dir=SNAPSHOT_DIR):
+    """Fetch stage: raw todayAnns.do page (kept in snapshot_dir), or None"""
+    return fetch_announcements_page(snapshot_dir=snapshot_dir)
+
+def parse_page(content):
+    """Parse stage: announcement rows from a raw page, or None if there is no table"""
+    return parse_announcements(content) if content is not None else None
+
+def enrich_announcements(announcements, top_n=TOP_N):
+    """
+    Enrich stage: resolve PDF URLs and short interest for the top_n
+    announcements only. Each gets "pdf_url" and "short_interest" keys.
+    Returns the top_n announcements.
+    """
+    top_announcements = announcements[:top_n]
+
+    print("\n" + "=" * 80)
+    print(f"FOUND {len(announcements)} POSITIVE ANNOUNCEMENTS")
+    print(f"OUTPUTTING TOP {len(top_announcements)} TO CSV")
+    print("=" * 80)
+
+    for i, ann in enumerate(top_announcements, 1):
+        print(f"{i}. {ann['ticker']}: {ann['title']} (Score: {ann['sentiment_score']})")
+
+    if not top_announcements:
+        return top_announcements
+
+    get_pdf_urls_for_announcements(top_announcements)
+    short_interest_data = get_short_interest_for_announcements(top_announcements)
+    for ann in top_announcements:
+        ann["short_interest"] = short_interest_data.get(ann["ticker"] + ".AX", "N/A")
+
+    get_archive().set_pdf_urls({
+        ann["landing_url"]: ann.get("pdf_url")
+        for ann in top_announcements if ann.get("landing_url")
+    })
+    return top_announcements
+
+def emit_outputs(top_announcements, chart=DEFAULT_CHART):
+    """Emit stage: write the CSV, then the chart in the given format. Returns the CSV filename."""
+    today_str = datetime.now(SYDNEY_TZ).strftime("%Y%m%d")
+    csv_filename = f"bullish_announcements_{today_str}.csv"
+
+    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+        fieldnames = ["rank", "date_time", "ticker", "pdf_url", "short_interest", "ChangePct", "title", "sentiment_score", "volume_buildup"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for idx, ann in enumerate(top_announcements, start=1):
+            formula = f'=GOOGLEFINANCE("ASX:" & C{idx+1}, "changepct")'
+
+            writer.writerow({
+                "rank": idx,
+                "date_time": ann["date_time"].strftime("%d/%m/%Y %H:%M") if ann["date_time"] else "N/A",
+                "ticker": ann["ticker"],
+                "pdf_url": ann.get("pdf_url") or "No PDF URL found",
+                "short_interest": ann.get("short_interest", "N/A"),
+                "ChangePct": formula,
+                "title": ann["title"],
+                "sentiment_score": ann["sentiment_score"],
+                "volume_buildup": ann.get("volume_buildup", 0)
+            })
+
+    print(f"\n✓ Saved CSV file: {csv_filename}")
+
+    if not top_announcements:
+        print("\nNo qualifying announcements found.")
+    elif chart != "none":
+        # The chart is written after the CSV so it never delays the handoff
+        chart_start = time.perf_counter()
+        chart_filename = render_chart(top_announcements, today_str, chart)
+        print(f"✓ Saved chart file: {chart_filename} ({time.perf_counter() - chart_start:.2f}s)")
+
+    return csv_filename
+
+def run_once(chart=DEFAULT_CHART):
+    """One full pass: fetch, parse, score, enrich and emit. Returns the top announcements."""
+    print("=" * 80)
+    print("ASX SENTIMENT ANALYZER - FILTERING FOR UNEXPECTED POSITIVE RESULTS")
+    print("=" * 80)
+
+    rows = parse_page(fetch_page())
+
+    # Keep every row we see, not just the ones that pass the filters
+    if rows:
+        print(f"Archived {get_archive().archive_rows(rows)} new announcements")
+
+    print("\n--- Updating local price store ---")
+    rows_written = get_price_store().update(TICKER_LIST)
+    print(f"Price store: {rows_written} new or refreshed bars")
+
+    if rows is not None:
+        announcements = score_announcements(rows)
+    else:
+        print("No announcements table found.")
+        announcements = []
+
+    top_announcements = enrich_announcements(announcements)
+    emit_outputs(top_announcements, chart=chart)
+
+    print("\n" + "=" * 80)
+    print("ANALYSIS COMPLETE")
+    print("=" * 80)
+    return top_announcements
+
+# Watch mode: (start, end, seconds between polls) in Sydney time, weekdays only.
+# Fast around the open when most price-sensitive news lands, slower in the afternoon.
+WATCH_SCHEDULE = [
+    (dt_time(7, 0), dt_time(10, 15), 5),
+    (dt_time(10, 15), dt_time(13, 0), 15),
+    (dt_time(13, 0), dt_time(16, 30), 30),
+]
+
+def watch_poll_interval(now):
+    """Seconds between polls at this Sydney time, or None outside the watch window"""
+    if now.weekday() >= 5:
+        return None
+    for start, end, interval in WATCH_SCHEDULE:
+        if start <= now.time() < end:
+            return interval
+    return None
+
+def announcement_key(row):
+    date_time = row.get("date_time")
+    return (row["ticker"], date_time.isoformat() if date_time else "", row["title"])
+
+def refresh_prices_in_background(running=None):
+    """
+    Top up the price store on a daemon thread so scoring never waits on
+    yfinance; scores use whatever bars are already stored. Returns the
+    refresh thread, or `running` if that one has not finished yet.
+    """
+    if running is not None and running.is_alive():
+        return running
+
+    def refresh():
+        try:
+            get_price_store().update(TICKER_LIST)
+        except Exception as e:
+            print(f"Price store refresh failed: {e}")
+
+    thread = threading.Thread(target=refresh, daemon=True, name="price-refresh")
+    thread.start()
+    return thread
+
+def watch():
+    """
+    Poll todayAnns.do through the trading day, score only rows not seen
+    before, and rewrite the CSV as soon as the top announcements change.
+    """
+    print("=" * 80)
+    print("ASX SENTIMENT ANALYZER - WATCH MODE")
+    print("=" * 80)
+
+    import requests
+    from asx_announcements import AnnouncementsPoller
+
+    poller = AnnouncementsPoller(snapshot_dir=SNAPSHOT_DIR)
+    archive = get_archive()
+    # Started before the window opens so bars are current by the first poll
+    price_refresh = refresh_prices_in_background()
+    seen = set()
+    announcements = []
+    last_top = None
+
+    while True:
+        now = datetime.now(SYDNEY_TZ)
+        interval = watch_poll_interval(now)
+        if interval is None:
+            first_start = WATCH_SCHEDULE[0][0]
+            if now.weekday() < 5 and now.time() < first_start:
+                wait = (SYDNEY_TZ.localize(datetime.combine(now.date(), first_start)) - now).total_seconds()
+                print(f"Waiting {int(wait)}s for the watch window to open...")
+                time.sleep(wait)
+                continue
+            print("Outside the market-hours watch window - stopping.")
+            break
+
+        started = time.monotonic()
+        try:
+            rows = poller.poll()
+        except requests.RequestException as e:
+            print(f"Poll failed: {e}")
+            rows = None
+
+        new_rows = [row for row in rows or [] if announcement_key(row) not in seen]
+        if new_rows:
+            seen.update(announcement_key(row) for row in new_rows)
+            print(f"\n[{now.strftime('%H:%M:%S')}] {len(new_rows)} new announcements "
+                  f"(archived {archive.archive_rows(new_rows)})")
+
+            # No network unless the store's refresh interval has passed
+            price_refresh = refresh_prices_in_background(price_refresh)
+            fresh = score_announcements(new_rows)
+            if fresh:
+                announcements = sorted(announcements + fresh, key=lambda x: x["sentiment_score"], reverse=True)
+                top_keys = [announcement_key(ann) for ann in announcements[:TOP_N]]
+                if top_keys != last_top:
+                    emit_outputs(enrich_announcements(announcements), chart="none")
+                    last_top = top_keys
+                    for ann in fresh:
+                        if ann["date_time"] and announcement_key(ann) in top_keys:
+                            latency = (datetime.now(SYDNEY_TZ) - ann["date_time"]).total_seconds()
+                            print(f"  Signal latency for {ann['ticker']}: {latency:.0f}s after release")
+
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ASX unexpected-positive announcement scanner")
+    parser.add_argument("--watch", action="store_true",
+                        help="poll through the trading day and update the CSV as announcements are released")
+    parser.add_argument("--chart", choices=CHART_FORMATS, default=DEFAULT_CHART,
+                        help=f"chart output after the CSV (default: {DEFAULT_CHART}; set N2_CHART to change)")
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        watch()
+    else:
+        run_once(chart=args.chart)
+
+if __name__ == "__main__":
+    main()
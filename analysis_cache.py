@@ -0,0 +1,148 @@
+# coding: utf-8
+"""
+Persistent cache of Gemini announcement analyses, addressed by content: the
+SHA-256 of the PDF bytes, the model, the prompt template version and a
+digest of the financial inputs in the prompt. Re-runs and repeated
+/api/analyze calls reuse the stored JSON instead of spending quota.
+
+How much the financial snapshot may have moved before a PDF is analysed
+again is set by ANALYSIS_CACHE_POLICY:
+
+    exact      any change to the financial inputs re-analyses
+    tolerant   re-analyse when a key input drifts past its tolerance (default)
+    pdf        the same PDF, ticker, title, model and prompt version is always reused
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlite_store import connect, init_store
+
+DEFAULT_PATH = os.getenv("ANALYSIS_CACHE_PATH", os.path.join("data", "gemini_analyses.sqlite"))
+POLICY = os.getenv("ANALYSIS_CACHE_POLICY", "tolerant")
+POLICIES = ("exact", "tolerant", "pdf")
+# Analyses older than this are never reused
+MAX_AGE = timedelta(days=float(os.getenv("ANALYSIS_CACHE_MAX_AGE_DAYS", "30")))
+
+# tolerant: largest relative move in these inputs that still reuses an analysis
+TOLERANCES = {
+    "current_price": 0.03,
+    "avg_volume_20d": 0.25,
+    "volume_ratio": 0.5,
+}
+# tolerant: inputs that must match exactly (a joint announcement is one PDF under several tickers)
+EXACT_FIELDS = ("ticker", "title", "breakout_score", "asic_short_position")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    pdf_sha256 TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    financial_digest TEXT NOT NULL,
+    ticker TEXT,
+    title TEXT,
+    created_at TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (pdf_sha256, model, prompt_version, financial_digest)
+);
+"""
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def financial_digest(inputs):
+    """Stable hash of the financial inputs (key order and number formatting do not matter)"""
+    return sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8"))
+
+
+def within_tolerance(saved, current):
+    for field in EXACT_FIELDS:
+        if saved.get(field) != current.get(field):
+            return False
+    for field, tolerance in TOLERANCES.items():
+        old, new = saved.get(field), current.get(field)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            if old != new:
+                return False
+            continue
+        if old == 0:
+            if new != 0:
+                return False
+        elif abs(new - old) / abs(old) > tolerance:
+            return False
+    return True
+
+
+class AnalysisCache:
+    def __init__(self, path=DEFAULT_PATH, policy=POLICY, max_age=MAX_AGE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown analysis cache policy: {policy} (expected one of {', '.join(POLICIES)})")
+        self.path = path
+        self.policy = policy
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.stores = 0
+        init_store(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, pdf_sha256, model, prompt_version, inputs):
+        """
+        The stored analysis for this PDF, model and prompt version that the
+        policy accepts for the current financial inputs, or None.
+        """
+        since = (datetime.now() - self.max_age).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT financial_digest, inputs, result FROM analyses "
+                "WHERE pdf_sha256 = ? AND model = ? AND prompt_version = ? AND created_at >= ? "
+                "ORDER BY created_at DESC",
+                (pdf_sha256, model, prompt_version, since)
+            ).fetchall()
+        digest = financial_digest(inputs)
+        for saved_digest, saved_inputs, result in rows:
+            saved_inputs = json.loads(saved_inputs)
+            same_prompt = all(saved_inputs.get(field) == inputs.get(field) for field in ("ticker", "title"))
+            if (saved_digest == digest
+                    or (self.policy == "pdf" and same_prompt)
+                    or (self.policy == "tolerant" and within_tolerance(saved_inputs, inputs))):
+                self._count("hits")
+                return json.loads(result)
+        # Rows exist for this PDF but the financial snapshot has moved too far
+        self._count("refreshed" if rows else "misses")
+        return None
+
+    def store(self, pdf_sha256, model, prompt_version, inputs, result, ticker=None, title=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses "
+                "(pdf_sha256, model, prompt_version, financial_digest, ticker, title, created_at, inputs, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (pdf_sha256, model, prompt_version, financial_digest(inputs), ticker, title,
+                 datetime.now().isoformat(), json.dumps(inputs, sort_keys=True, default=str),
+                 json.dumps(result))
+            )
+        self._count("stores")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshed": self.refreshed,
+                "stores": self.stores,
+            }
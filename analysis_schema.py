@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+The Gemini announcement analysis, declared once. FIELDS drives the JSON
+format shown in the prompt, the response schema sent through the SDK's
+structured-output mode, and the local validation that coerces a reply into
+clean values (salvaging what it can from a partly broken one).
+"""
+import json
+import re
+
+# (name, type, prompt hint, (low, high) bounds or allowed values)
+FIELDS = [
+    ("bullish_score", int, "<1-10 integer>", (1, 10)),
+    ("explosive_move_potential", int, "<1-10 integer where 10=near-certain 10%+ move, 7+=strong candidate>", (1, 10)),
+    ("rocket_thesis", str, "<string: max 2 sentences explaining specifically WHY this could be a multi-percent mover — catalyst + technical setup + squeeze potential>", None),
+    ("key_positive_factors", str, "<string>", None),
+    ("financial_highlights", str, "<string>", None),
+    ("future_outlook", str, "<string>", None),
+    ("market_impact", str, "<string>", None),
+    ("risk_factors", str, "<string>", None),
+    ("market_expectations_comparison", str, "<string>", None),
+    ("surprise_level", str, '<"low" | "medium" | "high">', ("low", "medium", "high")),
+    ("expected_daily_change_pct", float, "<float>", None),
+    ("prediction_confidence", int, "<1-5 integer>", (1, 5)),
+    ("reasoning_summary", str, "<string>", None),
+]
+KEYS = tuple(name for name, _, _, _ in FIELDS)
+# Ranking, the CSV and the sheet need these; a reply without them is re-asked.
+# Other fields missing from a reply are filled with MISSING.
+ESSENTIAL = ("bullish_score", "explosive_move_potential", "expected_daily_change_pct", "prediction_confidence")
+MISSING = "N/A"
+
+_SCHEMA_TYPES = {int: "INTEGER", float: "NUMBER", str: "STRING"}
+_NUMBER_RE = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+class IncompleteAnalysis(ValueError):
+    """A reply that lacked essential fields; partial holds the usable ones"""
+
+    def __init__(self, missing, partial):
+        super().__init__(f"missing or invalid: {', '.join(missing)}")
+        self.missing = missing
+        self.partial = partial
+
+
+def prompt_format():
+    """The analysis object as described to the model in the prompt"""
+    return "{\n" + ",\n".join(f'  "{name}": {hint}' for name, _, hint, _ in FIELDS) + "\n}"
+
+
+def response_schema(batch=False):
+    """
+    Response schema for GenerateContentConfig(response_mime_type="application/json").
+    A batch reply is an array of analyses, each with its ticker.
+    """
+    properties = {}
+    for name, kind, _, limits in FIELDS:
+        field = {"type": _SCHEMA_TYPES[kind]}
+        if kind is str and limits:
+            field["enum"] = list(limits)
+        elif limits:
+            field["minimum"], field["maximum"] = limits
+        properties[name] = field
+    order = list(KEYS)
+    if batch:
+        properties = dict({"ticker": {"type": "STRING"}}, **properties)
+        order = ["ticker"] + order
+    schema = {"type": "OBJECT", "properties": properties, "required": order, "propertyOrdering": order}
+    return {"type": "ARRAY", "items": schema} if batch else schema
+
+
+def coerce(name, value):
+    """value as the field's type within its bounds; ValueError if it cannot be"""
+    _, kind, _, limits = next(field for field in FIELDS if field[0] == name)
+    if value is None:
+        raise ValueError(f"{name} is null")
+    if kind is str:
+        text = str(value).strip()
+        if limits:
+            text = text.lower()
+            if text not in limits:
+                raise ValueError(f"{name} {value!r} not one of {limits}")
+        return text
+    if isinstance(value, bool):
+        raise ValueError(f"{name} {value!r} is not a number")
+    if isinstance(value, str):
+        # "7", "7/10", "+4.5%"
+        match = _NUMBER_RE.search(value)
+        if not match:
+            raise ValueError(f"{name} {value!r} is not a number")
+        value = float(match.group())
+    number = float(value)
+    if number != number:
+        raise ValueError(f"{name} is NaN")
+    if limits:
+        number = min(max(number, limits[0]), limits[1])
+    return int(round(number)) if kind is int else number
+
+
+def validate(obj):
+    """
+    (analysis, missing): every field coerced or filled with MISSING, and the
+    essential fields that were absent or unusable.
+    """
+    analysis, missing = {}, []
+    for name in KEYS:
+        try:
+            analysis[name] = coerce(name, obj[name])
+        except (KeyError, TypeError, ValueError):
+            analysis[name] = MISSING
+            if name in ESSENTIAL:
+                missing.append(name)
+    return analysis, missing
+
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def salvage_objects(text):
+    """
+    Every JSON object that can be recovered from a reply: the parsed value
+    when the text is valid (an object, an array of them, or an object keyed
+    by ticker), otherwise each complete object found in it.
+    """
+    text = _strip_code_fence(text)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = []
+        decoder = json.JSONDecoder()
+        position = 0
+        while True:
+            position = text.find("{", position)
+            if position < 0:
+                break
+            try:
+                element, position = decoder.raw_decode(text, position)
+                data.append(element)
+            except ValueError:
+                position += 1
+    if isinstance(data, dict):
+        if data and all(isinstance(value, dict) for value in data.values()) and not set(data) & set(KEYS):
+            return [dict(value, ticker=key) for key, value in data.items()]
+        return [data]
+    return [element for element in data if isinstance(element, dict)] if isinstance(data, list) else []
+
+
+def salvage_fields(text):
+    """Field values readable from a reply too broken to parse as JSON (e.g. cut off mid-object)"""
+    fields = {}
+    for name in KEYS:
+        match = re.search(rf'"{name}"\s*:\s*("(?:[^"\\]|\\.)*"|[-+\d.]+)', text)
+        if match:
+            try:
+                fields[name] = json.loads(match.group(1))
+            except ValueError:
+                continue
+    return fields
+
+
+def parse_analysis(text):
+    """
+    A validated analysis from a single-announcement reply. Raises
+    IncompleteAnalysis, carrying whatever was usable, when essential fields
+    are missing.
+    """
+    objects = salvage_objects(text)
+    candidate = objects[0] if objects else salvage_fields(_strip_code_fence(text))
+    analysis, missing = validate(candidate)
+    if missing:
+        raise IncompleteAnalysis(missing, {k: v for k, v in analysis.items() if v != MISSING})
+    return analysis
@@ -0,0 +1,203 @@
+# coding: utf-8
+"""
+Local archive of every ASX announcement row seen by N2.py, with indexed
+lookup by ticker, date and title phrase.
+
+    python announcement_archive.py backfill data/snapshots/*.html.gz
+    python announcement_archive.py search --phrase takeover --since 2025-01-01 --until 2025-12-31 --watchlist
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytz
+
+from asx_announcements import SNAPSHOT_DIR, parse_announcements, read_snapshot_html
+from sqlite_store import connect, init_store
+from ticker_universe import load_universe
+
+DEFAULT_PATH = os.getenv("ANNOUNCEMENT_ARCHIVE_PATH", os.path.join("data", "announcements.sqlite"))
+SYDNEY_TZ = pytz.timezone("Australia/Sydney")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS announcements (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    announced_at TEXT NOT NULL,
+    announced_date TEXT,
+    price_sensitive INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    landing_url TEXT,
+    pdf_url TEXT,
+    first_seen TEXT NOT NULL,
+    UNIQUE (ticker, announced_at, title)
+);
+CREATE INDEX IF NOT EXISTS idx_announcements_ticker_date ON announcements (ticker, announced_date);
+CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements (announced_date);
+CREATE INDEX IF NOT EXISTS idx_announcements_landing_url ON announcements (landing_url);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS announcements_fts USING fts5 (
+    title, content='announcements', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS announcements_ai AFTER INSERT ON announcements BEGIN
+    INSERT INTO announcements_fts (rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS announcements_ad AFTER DELETE ON announcements BEGIN
+    INSERT INTO announcements_fts (announcements_fts, rowid, title) VALUES ('delete', old.id, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS announcements_au AFTER UPDATE OF title ON announcements BEGIN
+    INSERT INTO announcements_fts (announcements_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    INSERT INTO announcements_fts (rowid, title) VALUES (new.id, new.title);
+END;
+"""
+
+COLUMNS = ["ticker", "announced_at", "announced_date", "price_sensitive", "title", "landing_url", "pdf_url", "first_seen"]
+
+
+class AnnouncementArchive:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        init_store(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path, row_factory=sqlite3.Row)
+
+    def archive_rows(self, rows, seen_at=None):
+        """
+        Store parsed announcement rows. Rows already archived are kept; a
+        landing or PDF URL learned later is filled in. Returns the number of
+        new rows.
+        """
+        seen_at = (seen_at or datetime.now(SYDNEY_TZ)).isoformat()
+        records = []
+        for row in rows:
+            date_time = row.get("date_time")
+            records.append((
+                row["ticker"],
+                date_time.isoformat() if date_time else "",
+                date_time.strftime("%Y-%m-%d") if date_time else None,
+                int(bool(row.get("price_sensitive"))),
+                row["title"],
+                row.get("landing_url"),
+                row.get("pdf_url"),
+                seen_at,
+            ))
+
+        with self._write_lock, self._connect() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM announcements").fetchone()[0]
+            conn.executemany(
+                f"INSERT INTO announcements ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                "ON CONFLICT (ticker, announced_at, title) DO UPDATE SET "
+                "landing_url = COALESCE(announcements.landing_url, excluded.landing_url), "
+                "pdf_url = COALESCE(excluded.pdf_url, announcements.pdf_url) "
+                "WHERE excluded.pdf_url IS NOT NULL OR announcements.landing_url IS NULL",
+                records
+            )
+            return conn.execute("SELECT COUNT(*) FROM announcements WHERE id > ?", (last_id,)).fetchone()[0]
+
+    def set_pdf_urls(self, pdf_urls_by_landing):
+        """Record resolved PDF URLs, keyed by landing URL"""
+        with self._write_lock, self._connect() as conn:
+            conn.executemany(
+                "UPDATE announcements SET pdf_url = ? WHERE landing_url = ?",
+                [(pdf_url, landing_url) for landing_url, pdf_url in pdf_urls_by_landing.items() if pdf_url]
+            )
+
+    def backfill(self, paths):
+        """Archive rows from saved HTML snapshots. Returns the number of new rows."""
+        total = 0
+        for path in sorted(paths):
+            rows = parse_announcements(read_snapshot_html(path))
+            if rows:
+                total += self.archive_rows(rows)
+        return total
+
+    def dates(self, since=None, until=None):
+        """Distinct announcement dates (YYYY-MM-DD) in the archive, oldest first"""
+        query = "SELECT DISTINCT announced_date FROM announcements WHERE announced_date IS NOT NULL"
+        params = []
+        if since:
+            query += " AND announced_date >= ?"
+            params.append(since)
+        if until:
+            query += " AND announced_date <= ?"
+            params.append(until)
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(query + " ORDER BY announced_date", params)]
+
+    def search(self, phrase=None, tickers=None, since=None, until=None, price_sensitive=None, limit=None):
+        """
+        Look up archived announcements. phrase is an FTS5 query on titles
+        (e.g. 'takeover' or '"scheme of arrangement"'); since/until are
+        inclusive YYYY-MM-DD dates; tickers are ASX codes without .AX.
+        """
+        query = f"SELECT a.id, {', '.join('a.' + c for c in COLUMNS)} FROM announcements a"
+        clauses, params = [], []
+        if phrase:
+            query += " JOIN announcements_fts f ON f.rowid = a.id"
+            clauses.append("announcements_fts MATCH ?")
+            params.append(phrase)
+        if tickers:
+            tickers = sorted({t.upper().replace(".AX", "") for t in tickers})
+            clauses.append(f"a.ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(tickers)
+        if since:
+            clauses.append("a.announced_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("a.announced_date <= ?")
+            params.append(until)
+        if price_sensitive is not None:
+            clauses.append("a.price_sensitive = ?")
+            params.append(int(price_sensitive))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY a.announced_at"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASX announcement archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = sub.add_parser("backfill", help="archive rows from saved todayAnns.do pages")
+    backfill_parser.add_argument("paths", nargs="*", help=f"HTML or .html.gz files (default: {SNAPSHOT_DIR}/*)")
+
+    search_parser = sub.add_parser("search", help="query the archive")
+    search_parser.add_argument("--phrase")
+    search_parser.add_argument("--ticker", action="append")
+    search_parser.add_argument("--watchlist", action="store_true", help="limit to tickers in value.csv")
+    search_parser.add_argument("--since")
+    search_parser.add_argument("--until")
+    search_parser.add_argument("--sensitive", action="store_true", help="price-sensitive only")
+    search_parser.add_argument("--limit", type=int)
+
+    args = parser.parse_args()
+    archive = AnnouncementArchive()
+
+    if args.command == "backfill":
+        paths = args.paths or glob.glob(os.path.join(SNAPSHOT_DIR, "*"))
+        print(f"Archived {archive.backfill(paths)} new announcements from {len(paths)} snapshots")
+    else:
+        tickers = set(args.ticker or [])
+        if args.watchlist:
+            tickers |= load_universe().tickers
+        rows = archive.search(args.phrase, tickers or None, args.since, args.until,
+                              True if args.sensitive else None, args.limit)
+        for row in rows:
+            flag = "*" if row["price_sensitive"] else " "
+            print(f"{row['announced_at'][:16]} {flag} {row['ticker']:<6} {row['title']}  {row['pdf_url'] or ''}")
+        print(f"{len(rows)} announcements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# coding: utf-8
+"""Fetch and parse the ASX "today's announcements" page in a single pass."""
+import gzip
+import hashlib
+import html as html_lib
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+ASX_URL = "https://www.asx.com.au/asx/v2/statistics/todayAnns.do"
+ASX_BASE_URL = "https://www.asx.com.au"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+PDF_LINK_FORM = "/asx/v2/statistics/displayAnnouncement.do?display=pdf&idsId="
+SYDNEY_TZ = pytz.timezone("Australia/Sydney")
+# Raw pages are kept here so the archive can be backfilled and the parser benchmarked
+SNAPSHOT_DIR = os.path.join("data", "snapshots")
+
+_PAGES_SUFFIX_RE = re.compile(r'\d+\s+pages?\s+\d+\.?\d*KB$')
+
+# Table extractor: the page is one flat table, so rows and cells are cut out
+# with compiled regexes instead of building a soup tree for the whole page
+_TABLE_RE = re.compile(r'<table\b[^>]*>(.*?)(?:</table>|$)', re.I | re.S)
+_TR_SPLIT_RE = re.compile(r'<tr\b[^>]*>', re.I)
+_TR_END_RE = re.compile(r'</tr\s*>', re.I)
+_TD_SPLIT_RE = re.compile(r'<td\b[^>]*>', re.I)
+_TD_END_RE = re.compile(r'</td\s*>', re.I)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_TAG_RE = re.compile(r'<[^>]*>')
+_ASTERIX_RE = re.compile(r'<img\b[^>]*\balt\s*=\s*["\']?asterix["\'\s/>]', re.I)
+_HREF_RE = re.compile(r'<a\b[^>]*?\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+
+
+@lru_cache(maxsize=4096)
+def parse_announcement_datetime(date_time_str):
+    formats_to_try = [
+        "%d/%m/%Y %I:%M %p",
+        "%d/%m/%Y %H:%M",
+        "%d/%m/%Y\n%I:%M %p",
+        "%d/%m/%Y\n%H:%M",
+    ]
+
+    for fmt in formats_to_try:
+        try:
+            dt = datetime.strptime(date_time_str, fmt)
+            return SYDNEY_TZ.localize(dt)
+        except ValueError:
+            continue
+    return None
+
+
+def _cell_strings(cell):
+    """Stripped, non-empty text fragments of a cell (BeautifulSoup's stripped_strings)"""
+    strings = []
+    for fragment in _TAG_RE.split(cell):
+        fragment = html_lib.unescape(fragment).strip()
+        if fragment:
+            strings.append(fragment)
+    return strings
+
+
+def _decode(html):
+    if isinstance(html, str):
+        return html
+    try:
+        return html.decode("utf-8")
+    except UnicodeDecodeError:
+        return html.decode("cp1252", errors="replace")
+
+
+def parse_announcements(html):
+    """
+    Parse the announcements table into a list of row dicts:
+    ticker, date_time, price_sensitive, title and landing_url.
+    Returns None if the page has no announcements table.
+    """
+    table = _TABLE_RE.search(_COMMENT_RE.sub('', _decode(html)))
+    if not table:
+        return None
+
+    rows = []
+    for tr in _TR_SPLIT_RE.split(table.group(1))[2:]:  # Skip text before the first row and the header row
+        tr = _TR_END_RE.split(tr, 1)[0]
+        tds = [_TD_END_RE.split(td, 1)[0] for td in _TD_SPLIT_RE.split(tr)[1:]]
+        if len(tds) < 4:
+            continue
+
+        ticker = html_lib.unescape(_TAG_RE.sub('', tds[0])).strip().upper()
+
+        # Extract date/time
+        date_lines = _cell_strings(tds[1])
+        if len(date_lines) >= 2:
+            date_time_str = f"{date_lines[0]} {date_lines[1]}"
+        elif len(date_lines) == 1:
+            date_time_str = date_lines[0]
+        else:
+            date_time_str = ""
+
+        # Extract and clean title
+        full_title_text = " ".join(_cell_strings(tds[3]))
+        title = _PAGES_SUFFIX_RE.sub('', full_title_text).strip()
+
+        # Landing page link (resolves to the PDF later)
+        landing_url = None
+        href_match = _HREF_RE.search(tds[3])
+        if href_match:
+            href_raw = html_lib.unescape(next(g for g in href_match.groups() if g is not None))
+            href_clean = href_raw.replace('\n', '').replace('\r', '').replace(' ', '')
+            if PDF_LINK_FORM in href_clean:
+                landing_url = ASX_BASE_URL + href_clean
+
+        rows.append({
+            "ticker": ticker,
+            "date_time": parse_announcement_datetime(date_time_str),
+            "price_sensitive": _ASTERIX_RE.search(tds[2]) is not None,
+            "title": title,
+            "landing_url": landing_url,
+        })
+
+    return rows
+
+
+def parse_announcements_soup(html):
+    """
+    Reference BeautifulSoup implementation of parse_announcements(), kept for
+    the parser benchmark and as a fallback for unusual markup.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table")
+    if not table:
+        return None
+
+    rows = []
+    for tr in table.find_all("tr")[1:]:  # Skip header row
+        tds = tr.find_all("td")
+        if len(tds) < 4:
+            continue
+
+        ticker = tds[0].text.strip().upper()
+
+        # Extract date/time
+        date_lines = [line.strip() for line in tds[1].stripped_strings]
+        if len(date_lines) >= 2:
+            date_time_str = f"{date_lines[0]} {date_lines[1]}"
+        elif len(date_lines) == 1:
+            date_time_str = date_lines[0]
+        else:
+            date_time_str = ""
+
+        # Extract and clean title
+        full_title_text = tds[3].get_text(separator=" ", strip=True)
+        title = _PAGES_SUFFIX_RE.sub('', full_title_text).strip()
+
+        # Landing page link (resolves to the PDF later)
+        landing_url = None
+        a_tag = tds[3].find("a", href=True)
+        if a_tag:
+            href_clean = a_tag["href"].replace('\n', '').replace('\r', '').replace(' ', '')
+            if PDF_LINK_FORM in href_clean:
+                landing_url = ASX_BASE_URL + href_clean
+
+        rows.append({
+            "ticker": ticker,
+            "date_time": parse_announcement_datetime(date_time_str),
+            "price_sensitive": tds[2].find("img", alt="asterix") is not None,
+            "title": title,
+            "landing_url": landing_url,
+        })
+
+    return rows
+
+
+def save_snapshot_html(content, fetched_at=None, snapshot_dir=SNAPSHOT_DIR):
+    """Keep a gzipped copy of a raw todayAnns.do page"""
+    fetched_at = fetched_at or datetime.now(SYDNEY_TZ)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    path = os.path.join(snapshot_dir, f"todayAnns_{fetched_at.strftime('%Y%m%d_%H%M%S')}.html.gz")
+    with gzip.open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def read_snapshot_html(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+def fetch_announcements_page(url=ASX_URL, headers=HEADERS, snapshot_dir=None):
+    """
+    Download today's announcements page once, optionally keeping the raw
+    page in snapshot_dir. Returns the page bytes, or None if unavailable.
+    """
+    import requests
+
+    print(f"\nFetching from URL: {url}")
+    response = requests.get(url, headers=headers)
+    print(f"Response status code: {response.status_code}")
+    if response.status_code != 200:
+        return None
+    if snapshot_dir:
+        save_snapshot_html(response.content, snapshot_dir=snapshot_dir)
+    return response.content
+
+
+def fetch_announcements_snapshot(url=ASX_URL, headers=HEADERS, snapshot_dir=None):
+    """
+    Download and parse today's announcements once. Returns the parsed rows,
+    or None if the page or table is unavailable.
+    """
+    content = fetch_announcements_page(url, headers, snapshot_dir)
+    return parse_announcements(content) if content is not None else None
+
+
+class AnnouncementsPoller:
+    """
+    Repeated polling of todayAnns.do for watch mode. Sends conditional
+    requests (If-None-Match / If-Modified-Since) and also skips pages whose
+    body is byte-identical to the last one, so unchanged polls cost no parse.
+    """
+
+    def __init__(self, url=ASX_URL, headers=HEADERS, snapshot_dir=None, timeout=10):
+        import requests
+
+        self.url = url
+        self.headers = headers
+        self.snapshot_dir = snapshot_dir
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+
+    def poll(self):
+        """Parsed rows if the page changed since the last poll, otherwise None"""
+        headers = dict(self.headers)
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            print(f"Announcements poll returned status code {response.status_code}")
+            return None
+
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        digest = hashlib.sha1(response.content).hexdigest()
+        if digest == self.digest:
+            return None
+        self.digest = digest
+
+        if self.snapshot_dir:
+            save_snapshot_html(response.content, snapshot_dir=self.snapshot_dir)
+        return parse_announcements(response.content)
@@ -0,0 +1,112 @@
+# coding: utf-8
+"""
+Benchmark the announcements-table extractor against the BeautifulSoup path.
+
+    python bench_parser.py                      # saved pages in data/snapshots
+    python bench_parser.py page1.html.gz ...    # specific saved pages
+    python bench_parser.py --synthetic 3000     # generated heavy-day page
+
+Every page is parsed by both implementations and the results are compared
+row for row before timings are reported.
+"""
+import argparse
+import glob
+import os
+import random
+import timeit
+
+from asx_announcements import (
+    SNAPSHOT_DIR, parse_announcements, parse_announcements_soup, read_snapshot_html,
+)
+
+ROW_TEMPLATE = """
+<tr>
+<td>{ticker}</td>
+<td>18/08/2025<br/>
+<span class="dates-time">{hour}:{minute:02d} {ampm}</span></td>
+<td class="pricesens">{sensitive}</td>
+<td>
+<a href="/asx/v2/statistics/displayAnnouncement.do?display=pdf&amp;idsId={ids_id:08d}" target="_blank">
+{title}
+<br/>
+<span class="page">{pages} pages</span>
+<span class="filesize">{size:.1f}KB</span>
+</a>
+</td>
+</tr>"""
+
+TITLES = [
+    "Full Year Statutory Accounts", "Appendix 4E and Annual Report", "Record Profit &amp; Final Dividend",
+    "Takeover Offer Received", "Change of Director&#39;s Interest Notice", "Quarterly Activities Report",
+    "Significant Discovery at Flagship Project", "Trading Halt", "Becoming a substantial holder",
+]
+
+
+def synthetic_page(rows, seed=0):
+    rng = random.Random(seed)
+    body = []
+    for i in range(rows):
+        hour = rng.randint(7, 16)
+        body.append(ROW_TEMPLATE.format(
+            ticker="".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3)),
+            hour=hour if hour <= 12 else hour - 12,
+            minute=rng.randint(0, 59),
+            ampm="am" if hour < 12 else "pm",
+            sensitive='<img src="/images/asterix.gif" class="pricesens" alt="asterix" title="price sensitive">'
+            if rng.random() < 0.3 else "",
+            ids_id=2900000 + i,
+            title=rng.choice(TITLES),
+            pages=rng.randint(1, 120),
+            size=rng.uniform(50, 9000),
+        ))
+    return (
+        "<html><head><title>ASX Announcements</title></head><body><div class=\"page\">"
+        "<table>\n<tr><th>ASX Code</th><th>Date</th><th>Price sens.</th><th>Headline</th></tr>"
+        + "".join(body) + "\n</table></div></body></html>"
+    ).encode("utf-8")
+
+
+def best_time(func, html, repeat):
+    return min(timeit.repeat(lambda: func(html), number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ASX announcements parser")
+    parser.add_argument("paths", nargs="*", help=f"saved pages (default: {SNAPSHOT_DIR}/*)")
+    parser.add_argument("--synthetic", type=int, metavar="ROWS",
+                        help="benchmark a generated page with this many rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    if args.synthetic:
+        pages.append((f"synthetic-{args.synthetic}", synthetic_page(args.synthetic)))
+    else:
+        paths = args.paths or sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "*")))
+        pages = [(os.path.basename(p), read_snapshot_html(p)) for p in paths]
+        if not pages:
+            print(f"No saved pages in {SNAPSHOT_DIR}; using a synthetic 3000-row page")
+            pages.append(("synthetic-3000", synthetic_page(3000)))
+
+    print(f"{'page':<36} {'rows':>6} {'soup ms':>9} {'fast ms':>9} {'speedup':>8}")
+    total_soup = total_fast = 0.0
+    for name, html in pages:
+        expected = parse_announcements_soup(html)
+        actual = parse_announcements(html)
+        if actual != expected:
+            raise SystemExit(f"{name}: extractor output differs from the BeautifulSoup path")
+
+        soup_s = best_time(parse_announcements_soup, html, args.repeat)
+        fast_s = best_time(parse_announcements, html, args.repeat)
+        total_soup += soup_s
+        total_fast += fast_s
+        print(f"{name[:36]:<36} {len(actual or []):>6} {soup_s * 1000:>9.1f} {fast_s * 1000:>9.1f} "
+              f"{soup_s / fast_s:>7.1f}x")
+
+    if len(pages) > 1:
+        print(f"{'total':<36} {'':>6} {total_soup * 1000:>9.1f} {total_fast * 1000:>9.1f} "
+              f"{total_soup / total_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
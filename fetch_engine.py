@@ -0,0 +1,101 @@
+# coding: utf-8
+"""Thread-pool HTTP fetcher with per-host concurrency limits, politeness and retries."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+# Per-host settings: max in-flight requests and minimum gap between request starts (seconds)
+HOST_POLICIES = {
+    "www.asx.com.au": {"max_concurrency": 8, "min_interval": 0.05},
+}
+DEFAULT_POLICY = {"max_concurrency": 4, "min_interval": 0.0}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostAwareFetcher:
+    def __init__(self, host_policies=None, timeout=10, retries=2, backoff=0.5, max_workers=None):
+        self.host_policies = dict(HOST_POLICIES)
+        if host_policies:
+            self.host_policies.update(host_policies)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        if max_workers is None:
+            max_workers = sum(p["max_concurrency"] for p in self.host_policies.values()) + DEFAULT_POLICY["max_concurrency"]
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._host_state = {}
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _state_for(self, host):
+        with self._lock:
+            state = self._host_state.get(host)
+            if state is None:
+                policy = self.host_policies.get(host, DEFAULT_POLICY)
+                state = {
+                    "policy": policy,
+                    "semaphore": threading.BoundedSemaphore(policy["max_concurrency"]),
+                    "next_start": 0.0,
+                }
+                self._host_state[host] = state
+            return state
+
+    def _wait_for_slot(self, state):
+        """Space request starts to the same host by the policy's min_interval"""
+        interval = state["policy"]["min_interval"]
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, state["next_start"])
+            state["next_start"] = start_at + interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def get(self, url, headers=None, timeout=None):
+        """
+        GET a URL within its host's limits, retrying on connection errors and
+        429/5xx responses. Returns the final response; raises the last
+        exception if every attempt failed to connect.
+        """
+        state = self._state_for(urlsplit(url).netloc)
+        timeout = timeout or self.timeout
+
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            with state["semaphore"]:
+                self._wait_for_slot(state)
+                try:
+                    response = self._session().get(url, headers=headers, timeout=timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.retries:
+                        raise
+                    response = None
+
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+    def map(self, func, items):
+        """Run func over items concurrently, returning results in input order"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(func, items))
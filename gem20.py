@@ -8,16 +8,27 @@ import pandas as pd
 from datetime import datetime, timedelta
 import pytz
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import io
 import logging
 from flask import Flask, render_template, request, jsonify, send_from_directory
-import json
 import base64
+import hashlib
 import time
-import tempfile
 from flask_cors import CORS
 import yfinance as yf
-import numpy as np
+from price_store import FIELDS as PRICE_FIELDS, PriceStore
+from indicators import IndicatorBook, compute_indicators, disagreements
+from keyword_matcher import KeywordMatcher
+from short_interest import ShortInterestBook
+from ticker_universe import DEFAULT_PATH as UNIVERSE_PATH, WATCHLIST_PATH, build_universe, load_universe
+from gemini_limiter import QuotaExhausted, RateLimiter, estimate_tokens, is_rate_limit_error
+from analysis_schema import IncompleteAnalysis, parse_analysis, prompt_format, response_schema, salvage_objects, validate
+from ttl_cache import TTLCache
+from info_cache import InfoCache
+from analysis_cache import AnalysisCache, sha256
+from pipeline import Stage, run_pipeline
+from pdf_tools import MAX_PDF_BYTES, PdfTooLarge, download_pdf, trim_pdf
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -59,235 +70,328 @@ def serve_file(path):
         app.logger.error(f'File not found: {path}')
         return jsonify({"error": f"File {path} not found"}), 404
 
+# Pre-AI title filters, compiled once into a single matcher
+CAPITAL_RAISE_KEYWORDS = [
+    'placement', 'entitlement', 'rights issue', 'spp', 'share purchase plan',
+    'capital raising', 'capital raise', 'prospectus', 'offer', 'dilution',
+    'renounceable', 'non-renounceable', 'equity raising', 'bookbuild'
+]
+BIOTECH_TRIAL_KEYWORDS = [
+    'phase 1', 'phase 2', 'phase 3', 'phase ii', 'phase iii',
+    'clinical trial', 'trial result', 'dosing', 'enrolment', 'cohort',
+    'first patient', 'top-line data', 'interim data', 'tga approval'
+]
+PREFILTER_MATCHER = KeywordMatcher({
+    'capital_raise': CAPITAL_RAISE_KEYWORDS,
+    'biotech_trial': BIOTECH_TRIAL_KEYWORDS,
+})
+
+# Financial data cache: entries per ticker/date, seconds to live
+FINANCIAL_CACHE_SIZE = 512
+COMPREHENSIVE_TTL = 30 * 60
+INTRADAY_LIVE_TTL = 60 * 60
+# A finished session's hourly bars never change
+INTRADAY_PAST_TTL = 7 * 24 * 60 * 60
+# Concurrent info lookups in the market snapshot stage
+SNAPSHOT_WORKERS = 8
+# Analysis pipeline: workers per stage, and how long the Gemini stage waits to fill a batch
+PDF_WORKERS = 4
+MARKET_DATA_WORKERS = 4
+BATCH_WAIT = 2.0
+# Part of the analysis cache key: bump whenever the Gemini prompt or its output keys change
+PROMPT_VERSION = "rocket-v1"
+# Batch mode: up to this many announcements per generate_content call (1 = one call each)
+BATCH_MAX_ITEMS = int(os.getenv('GEMINI_BATCH_SIZE', '4'))
+# Estimated input tokens per batch request; batches are cut to fit (and to the limiter's TPM)
+BATCH_MAX_TOKENS = int(os.getenv('GEMINI_BATCH_TOKENS', '120000'))
+
+ANALYSIS_STEPS = """**Your Goal:** Identify whether this stock is about to make a significant move (5%+, ideally 10%+).
+
+**Analysis Steps:**
+1. **Catalyst Quality**: What is the core news? Is it a takeover bid, record earnings beat, major contract, significant discovery, or guidance upgrade? Rate how material this is.
+2. **Surprise Factor**: Does this news deviate significantly from what the market expected? Unexpected positives cause the biggest moves.
+3. **Technical Setup**: Given the Breakout Score, RSI zone, BB squeeze, and MACD signal — is the stock technically ready to explode? A coiling setup + strong catalyst = rocket.
+4. **Short Squeeze Potential**: High short % of float + positive catalyst = forced short covering amplifies the move. Assess this.
+5. **Retail FOMO Trigger**: Is this the type of news that retail investors will pile into? (Takeovers, record profits, gold/resource discoveries, brand-name companies beating expectations)
+6. **Volume Momentum**: Is smart money already accumulating (5-day volume trend elevated)?
+7. **Quantitative Prediction**: Estimate next-day % price change. Be aggressive and realistic — do not be conservative if the setup is genuinely strong."""
+
+ANALYSIS_FORMAT = prompt_format()
+# Structured output: Gemini returns JSON matching the analysis schema (an array of them for a batch)
+ANALYSIS_CONFIG = genai_types.GenerateContentConfig(
+    response_mime_type='application/json', response_schema=response_schema())
+BATCH_ANALYSIS_CONFIG = genai_types.GenerateContentConfig(
+    response_mime_type='application/json', response_schema=response_schema(batch=True))
+
+
+def file_mtime(path):
+    """path's modification time, or None if it does not exist"""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def parse_batch_response(text, tickers):
+    """
+    {ticker: analysis} for every element of a batch reply that validates
+    against the analysis schema. A truncated or partly malformed reply still
+    yields the complete elements before the damage.
+    """
+    wanted = {ticker.upper() for ticker in tickers}
+    parsed = {}
+    for element in salvage_objects(text):
+        ticker = str(element.get('ticker', '')).upper().replace('.AX', '')
+        analysis, missing = validate(element)
+        if ticker in wanted and not missing:
+            parsed[ticker] = analysis
+    return parsed
+
 class EnhancedFinancialDataManager:
     def __init__(self):
-        self.cache = {}
-        self.cache_expiry = {}
+        # Shared by Flask request threads and the analysis thread
+        self.cache = TTLCache(maxsize=FINANCIAL_CACHE_SIZE, ttl=COMPREHENSIVE_TTL)
+        self.price_store = PriceStore()
+        # Info snapshots survive restarts unless FINANCIAL_DISK_CACHE=0
+        self.info_cache = InfoCache() if os.getenv('FINANCIAL_DISK_CACHE', '1') != '0' else None
+        # Streaming indicator state, advanced by each market snapshot and checkpointed
+        self.indicator_book = IndicatorBook.load()
+        self.indicator_lock = threading.Lock()
+
+    def _get_info(self, asx_ticker):
+        fetch = lambda: yf.Ticker(asx_ticker).info
+        if self.info_cache is None:
+            return fetch()
+        return self.info_cache.get(asx_ticker, fetch)
 
     def get_intraday_data(self, ticker, announcement_date=None):
         try:
             if announcement_date is None:
                 announcement_date = datetime.today().date()
 
-            cache_key = f"{ticker}_intraday_{announcement_date}"
-            if cache_key in self.cache:
-                if datetime.now() < self.cache_expiry.get(cache_key, datetime.min):
-                    return self.cache[cache_key]
+            ttl = self._intraday_ttl(announcement_date)
+            return self.cache.get_or_load(
+                (ticker, "intraday", announcement_date),
+                lambda: self._fetch_intraday_data(ticker, announcement_date),
+                ttl=lambda data: ttl if data else None
+            )
 
-            asx_ticker = f"{ticker}.AX"
-            stock = yf.Ticker(asx_ticker)
+        except Exception as e:
+            app.logger.error(f"Error fetching intraday data for {ticker}: {e}")
+            return None
 
-            start_date = announcement_date
-            end_date = announcement_date + timedelta(days=1)
+    def _intraday_ttl(self, announcement_date):
+        return INTRADAY_PAST_TTL if announcement_date < datetime.today().date() else INTRADAY_LIVE_TTL
 
-            hist = stock.history(start=start_date, end=end_date, interval="1h")
+    def _fetch_intraday_data(self, ticker, announcement_date):
+        asx_ticker = f"{ticker}.AX"
+        stock = yf.Ticker(asx_ticker)
 
-            if hist.empty:
-                app.logger.warning(f"No intraday data available for {ticker} on {announcement_date}")
-                return None
+        start_date = announcement_date
+        end_date = announcement_date + timedelta(days=1)
 
-            intraday_data = {
-                'timestamps': [ts.strftime('%H:%M') for ts in hist.index],
-                'prices': hist['Close'].tolist(),
-                'volumes': hist['Volume'].tolist(),
-                'open': hist['Open'].iloc[0] if len(hist) > 0 else None,
-                'close': hist['Close'].iloc[-1] if len(hist) > 0 else None,
-                'high': hist['High'].max(),
-                'low': hist['Low'].min(),
-                'date': announcement_date.strftime('%Y-%m-%d')
-            }
+        hist = stock.history(start=start_date, end=end_date, interval="1h")
+        return self._build_intraday_data(ticker, hist, announcement_date)
 
-            if intraday_data['open'] and intraday_data['close']:
-                intraday_data['change_pct'] = ((intraday_data['close'] - intraday_data['open']) / intraday_data['open']) * 100
-            else:
-                intraday_data['change_pct'] = 0
+    def _build_intraday_data(self, ticker, hist, announcement_date):
+        if hist.empty:
+            app.logger.warning(f"No intraday data available for {ticker} on {announcement_date}")
+            return None
 
-            self.cache[cache_key] = intraday_data
-            self.cache_expiry[cache_key] = datetime.now() + timedelta(hours=1)
+        intraday_data = {
+            'timestamps': [ts.strftime('%H:%M') for ts in hist.index],
+            'prices': hist['Close'].tolist(),
+            'volumes': hist['Volume'].tolist(),
+            'open': hist['Open'].iloc[0] if len(hist) > 0 else None,
+            'close': hist['Close'].iloc[-1] if len(hist) > 0 else None,
+            'high': hist['High'].max(),
+            'low': hist['Low'].min(),
+            'date': announcement_date.strftime('%Y-%m-%d')
+        }
 
-            app.logger.info(f"Fetched {len(hist)} hourly data points for {ticker} on {announcement_date}")
-            return intraday_data
+        if intraday_data['open'] and intraday_data['close']:
+            intraday_data['change_pct'] = ((intraday_data['close'] - intraday_data['open']) / intraday_data['open']) * 100
+        else:
+            intraday_data['change_pct'] = 0
 
-        except Exception as e:
-            app.logger.error(f"Error fetching intraday data for {ticker}: {e}")
-            return None
+        app.logger.info(f"Fetched {len(hist)} hourly data points for {ticker} on {announcement_date}")
+        return intraday_data
 
     def get_comprehensive_stock_data(self, ticker):
         try:
-            cache_key = f"{ticker}_comprehensive"
-            if cache_key in self.cache:
-                if datetime.now() < self.cache_expiry.get(cache_key, datetime.min):
-                    return self.cache[cache_key]
-
-            asx_ticker = f"{ticker}.AX"
-            stock = yf.Ticker(asx_ticker)
-
-            hist = stock.history(period="3mo")
-            info = stock.info
-
-            if hist.empty:
-                return self._get_default_data()
-
-            current_price = hist['Close'].iloc[-1]
-            previous_close = hist['Close'].iloc[-2] if len(hist) >= 2 else current_price
-
-            daily_change = (current_price - previous_close) / previous_close * 100
-            five_day_change = (hist['Close'].iloc[-1] - hist['Close'].iloc[-6]) / hist['Close'].iloc[-6] * 100 if len(hist) >= 6 else 0
-            thirty_day_change = (hist['Close'].iloc[-1] - hist['Close'].iloc[-31]) / hist['Close'].iloc[-31] * 100 if len(hist) >= 31 else 0
-
-            avg_volume = hist['Volume'].tail(20).mean()
-            current_volume = hist['Volume'].iloc[-1]
-            volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1
-
-            returns = hist['Close'].pct_change().dropna()
-            volatility = returns.std() * (252 ** 0.5) * 100
-
-            fifty_two_week_high = hist['High'].max()
-            fifty_two_week_low = hist['Low'].min()
-            price_to_52w_high = (current_price / fifty_two_week_high) * 100
-            price_to_52w_low = (current_price / fifty_two_week_low) * 100
-
-            rsi = self._calculate_rsi(hist['Close'])
-            macd_val, macd_signal, macd_hist = self._calculate_macd(hist['Close'])
-            bb_width = self._calculate_bb_width(hist['Close'])
-            breakout_score = self._calculate_breakout_score(hist, rsi, macd_hist, bb_width, info)
-
-            sma_20 = hist['Close'].tail(20).mean()
-            sma_50 = hist['Close'].tail(50).mean()
-            price_vs_sma20 = ((current_price - sma_20) / sma_20) * 100
-            price_vs_sma50 = ((current_price - sma_50) / sma_50) * 100
-
-            vol_5d_avg = hist['Volume'].tail(5).mean()
-            vol_5d_trend = round(vol_5d_avg / avg_volume, 2) if avg_volume > 0 else 1.0
-
-            market_cap = info.get('marketCap', 'N/A')
-            pe_ratio = info.get('trailingPE', 'N/A')
-            pb_ratio = info.get('priceToBook', 'N/A')
-            dividend_yield = info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0
-            beta = info.get('beta', 'N/A')
-            float_shares = info.get('floatShares', 'N/A')
-            short_ratio = info.get('shortRatio', 'N/A')
-            shares_short_pct = round(info.get('shortPercentOfFloat', 0) * 100, 1) if info.get('shortPercentOfFloat') else 0
-
-            sector = info.get('sector', 'N/A')
-            industry = info.get('industry', 'N/A')
-
-            comprehensive_data = {
-                "current_price": round(current_price, 2),
-                "previous_close": round(previous_close, 2),
-                "daily_change_pct": round(daily_change, 2),
-                "five_day_change_pct": round(five_day_change, 2),
-                "thirty_day_change_pct": round(thirty_day_change, 2),
-                "current_volume": int(current_volume),
-                "avg_volume_20d": int(avg_volume),
-                "volume_ratio": round(volume_ratio, 2),
-                "rsi_14": round(rsi, 2) if not pd.isna(rsi) else 'N/A',
-                "price_vs_sma20_pct": round(price_vs_sma20, 2),
-                "price_vs_sma50_pct": round(price_vs_sma50, 2),
-                "volatility_annual_pct": round(volatility, 2),
-                "fifty_two_week_high": round(fifty_two_week_high, 2),
-                "fifty_two_week_low": round(fifty_two_week_low, 2),
-                "price_to_52w_high_pct": round(price_to_52w_high, 2),
-                "price_to_52w_low_pct": round(price_to_52w_low, 2),
-                "market_cap": market_cap,
-                "pe_ratio": pe_ratio,
-                "pb_ratio": pb_ratio,
-                "dividend_yield_pct": round(dividend_yield, 2),
-                "beta": beta,
-                "float_shares": float_shares,
-                "short_ratio": round(short_ratio, 1) if isinstance(short_ratio, (int, float)) else 'N/A',
-                "shares_short_pct_float": shares_short_pct,
-                "macd_histogram": macd_hist if not pd.isna(macd_hist) else 'N/A',
-                "bb_width_pct": round(bb_width, 2) if not pd.isna(bb_width) else 'N/A',
-                "breakout_score": breakout_score,
-                "vol_5d_trend": vol_5d_trend,
-                "sector": sector,
-                "industry": industry,
-                "data_quality": "high"
-            }
-
-            self.cache[cache_key] = comprehensive_data
-            self.cache_expiry[cache_key] = datetime.now() + timedelta(minutes=30)
-
-            return comprehensive_data
+            # Fallback (low quality) data is returned but not cached
+            return self.cache.get_or_load(
+                (ticker, "comprehensive"),
+                lambda: self._fetch_comprehensive_stock_data(ticker),
+                ttl=lambda data: COMPREHENSIVE_TTL if data.get("data_quality") == "high" else None
+            )
 
         except Exception as e:
             app.logger.error(f"Error fetching comprehensive data for {ticker}: {e}")
             return self._get_default_data()
 
-    def _calculate_rsi(self, prices, window=14):
-        try:
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi.iloc[-1]
-        except:
-            return pd.NaN
-
-    def _calculate_macd(self, prices, fast=12, slow=26, signal=9):
-        try:
-            exp1 = prices.ewm(span=fast, adjust=False).mean()
-            exp2 = prices.ewm(span=slow, adjust=False).mean()
-            macd = exp1 - exp2
-            signal_line = macd.ewm(span=signal, adjust=False).mean()
-            histogram = macd - signal_line
-            return round(macd.iloc[-1], 4), round(signal_line.iloc[-1], 4), round(histogram.iloc[-1], 4)
-        except:
-            return pd.NaN, pd.NaN, pd.NaN
-
-    def _calculate_bb_width(self, prices, window=20):
-        try:
-            sma = prices.rolling(window).mean()
-            std = prices.rolling(window).std()
-            upper = sma + 2 * std
-            lower = sma - 2 * std
-            width = (upper - lower) / sma * 100
-            return width.iloc[-1]
-        except:
-            return pd.NaN
-
-    def _calculate_breakout_score(self, hist, rsi, macd_hist, bb_width, info):
-        score = 0
-
-        # RSI in sweet zone 40-65 (not overbought, momentum building)
-        if not pd.isna(rsi) and 40 <= rsi <= 65:
-            score += 2
-
-        # Bollinger Band squeeze: current width in bottom 25th percentile → coiling spring
-        if not pd.isna(bb_width):
-            sma = hist['Close'].rolling(20).mean()
-            std = hist['Close'].rolling(20).std()
-            hist_widths = ((sma + 2 * std) - (sma - 2 * std)) / sma * 100
-            hist_widths = hist_widths.dropna()
-            if len(hist_widths) >= 10 and bb_width <= hist_widths.quantile(0.25):
-                score += 2
-
-        # MACD histogram positive → momentum flipping bullish
-        if not pd.isna(macd_hist) and macd_hist > 0:
-            score += 2
-
-        # Volume building: 5-day average ≥ 1.5x 20-day average
-        if len(hist) >= 20:
-            avg_vol_20 = hist['Volume'].tail(20).mean()
-            avg_vol_5 = hist['Volume'].tail(5).mean()
-            if avg_vol_20 > 0 and avg_vol_5 / avg_vol_20 >= 1.5:
-                score += 2
-
-        # Price within 15% of 52-week high → approaching breakout territory
-        if len(hist) > 0:
-            high_52w = hist['High'].max()
-            current = hist['Close'].iloc[-1]
-            if high_52w > 0 and current / high_52w >= 0.85:
-                score += 1
+    def _fetch_comprehensive_stock_data(self, ticker):
+        asx_ticker = f"{ticker}.AX"
+
+        self.price_store.update([asx_ticker])
+        hist = self.price_store.history(asx_ticker, days=92)
+        info = self._get_info(asx_ticker)
+        return self._build_comprehensive_data(hist, info)
+
+    def _build_comprehensive_data(self, hist, info):
+        if hist.empty:
+            return self._get_default_data()
+        indicators = compute_indicators({field: hist[field].to_frame('ticker') for field in PRICE_FIELDS})
+        return self._format_comprehensive_data(indicators.iloc[0], info)
+
+    def _format_comprehensive_data(self, ind, info):
+        """The comprehensive dict from one ticker's row of compute_indicators() plus its info"""
+        current_price = ind['current_price']
+        avg_volume = ind['avg_volume_20d']
+        rsi = ind['rsi_14']
+        macd_hist = ind['macd_histogram']
+        bb_width = ind['bb_width_pct']
+
+        price_to_52w_high = (current_price / ind['fifty_two_week_high']) * 100
+        price_to_52w_low = (current_price / ind['fifty_two_week_low']) * 100
+        price_vs_sma20 = ((current_price - ind['sma_20']) / ind['sma_20']) * 100
+        price_vs_sma50 = ((current_price - ind['sma_50']) / ind['sma_50']) * 100
+        vol_5d_trend = round(ind['vol_5d_avg'] / avg_volume, 2) if avg_volume > 0 else 1.0
+
+        market_cap = info.get('marketCap', 'N/A')
+        pe_ratio = info.get('trailingPE', 'N/A')
+        pb_ratio = info.get('priceToBook', 'N/A')
+        dividend_yield = info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0
+        beta = info.get('beta', 'N/A')
+        float_shares = info.get('floatShares', 'N/A')
+        short_ratio = info.get('shortRatio', 'N/A')
+        shares_short_pct = round(info.get('shortPercentOfFloat', 0) * 100, 1) if info.get('shortPercentOfFloat') else 0
 
         # Short ratio > 3 days to cover → squeeze potential on positive catalyst
-        short_ratio = info.get('shortRatio', 0) or 0
-        if isinstance(short_ratio, (int, float)) and short_ratio > 3:
-            score += 1
+        breakout_score = int(ind['breakout_base'])
+        squeeze_ratio = info.get('shortRatio', 0) or 0
+        if isinstance(squeeze_ratio, (int, float)) and squeeze_ratio > 3:
+            breakout_score += 1
+        breakout_score = min(breakout_score, 10)
+
+        sector = info.get('sector', 'N/A')
+        industry = info.get('industry', 'N/A')
+
+        comprehensive_data = {
+            "current_price": round(current_price, 2),
+            "previous_close": round(ind['previous_close'], 2),
+            "daily_change_pct": round(ind['daily_change_pct'], 2),
+            "five_day_change_pct": round(ind['five_day_change_pct'], 2),
+            "thirty_day_change_pct": round(ind['thirty_day_change_pct'], 2),
+            "current_volume": int(ind['current_volume']),
+            "avg_volume_20d": int(avg_volume),
+            "volume_ratio": round(ind['volume_ratio'], 2),
+            "rsi_14": round(rsi, 2) if not pd.isna(rsi) else 'N/A',
+            "price_vs_sma20_pct": round(price_vs_sma20, 2),
+            "price_vs_sma50_pct": round(price_vs_sma50, 2),
+            "volatility_annual_pct": round(ind['volatility_annual_pct'], 2),
+            "fifty_two_week_high": round(ind['fifty_two_week_high'], 2),
+            "fifty_two_week_low": round(ind['fifty_two_week_low'], 2),
+            "price_to_52w_high_pct": round(price_to_52w_high, 2),
+            "price_to_52w_low_pct": round(price_to_52w_low, 2),
+            "market_cap": market_cap,
+            "pe_ratio": pe_ratio,
+            "pb_ratio": pb_ratio,
+            "dividend_yield_pct": round(dividend_yield, 2),
+            "beta": beta,
+            "float_shares": float_shares,
+            "short_ratio": round(short_ratio, 1) if isinstance(short_ratio, (int, float)) else 'N/A',
+            "shares_short_pct_float": shares_short_pct,
+            "macd_histogram": macd_hist if not pd.isna(macd_hist) else 'N/A',
+            "bb_width_pct": round(bb_width, 2) if not pd.isna(bb_width) else 'N/A',
+            "breakout_score": breakout_score,
+            "vol_5d_trend": vol_5d_trend,
+            "sector": sector,
+            "industry": industry,
+            "data_quality": "high"
+        }
+        return comprehensive_data
+
+    def prefetch(self, tickers, announcement_date=None):
+        """
+        Market snapshot stage: fetch every ticker's daily history, info and
+        intraday bars once and seed the cache, so the prompt builder and the
+        API read from memory. History is one batched price-store update, info
+        lookups run concurrently and the hourly bars are one multi-ticker
+        download. Tickers whose fetch fails are left to the per-ticker path.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return
+        if announcement_date is None:
+            announcement_date = datetime.today().date()
+        asx_tickers = [f"{ticker}.AX" for ticker in tickers]
+        started = time.perf_counter()
+
+        self.price_store.update(asx_tickers)
 
-        return min(score, 10)
+        def safe_info(asx_ticker):
+            try:
+                return self._get_info(asx_ticker)
+            except Exception as e:
+                app.logger.warning(f"Snapshot info lookup failed for {asx_ticker}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS) as pool:
+            infos = list(pool.map(safe_info, asx_tickers))
+
+        # Indicators for every ticker in one vectorised pass over a 92-day panel
+        panels = self.price_store.panels(asx_tickers, days=92)
+        indicators = compute_indicators(panels)
+        self.advance_indicator_book(panels, indicators)
+        for ticker, asx_ticker, info in zip(tickers, asx_tickers, infos):
+            if info is None or not indicators.at[asx_ticker, 'n_bars']:
+                continue
+            try:
+                data = self._format_comprehensive_data(indicators.loc[asx_ticker], info)
+            except (TypeError, ValueError) as e:
+                app.logger.warning(f"Snapshot indicators unusable for {ticker}: {e}")
+                continue
+            self.cache.set((ticker, "comprehensive"), data, COMPREHENSIVE_TTL)
+
+        try:
+            intraday = yf.download(asx_tickers, start=announcement_date,
+                                   end=announcement_date + timedelta(days=1), interval="1h",
+                                   group_by="column", progress=False, multi_level_index=True)
+        except Exception as e:
+            app.logger.warning(f"Snapshot intraday download failed: {e}")
+            intraday = None
+        if intraday is not None and not intraday.empty:
+            ttl = self._intraday_ttl(announcement_date)
+            for ticker, asx_ticker in zip(tickers, asx_tickers):
+                if asx_ticker not in intraday.columns.get_level_values(1):
+                    continue
+                hist = intraday.xs(asx_ticker, axis=1, level=1).dropna(subset=["Close"])
+                data = self._build_intraday_data(ticker, hist, announcement_date)
+                if data:
+                    self.cache.set((ticker, "intraday", announcement_date), data, ttl)
+
+        app.logger.info(f"Market snapshot for {len(tickers)} tickers in {time.perf_counter() - started:.1f}s")
+
+    def advance_indicator_book(self, panels, indicators):
+        """
+        Feed the snapshot's new bars to the streaming indicator book and
+        checkpoint it. Tickers whose streamed values no longer match the
+        vectorised ones (a rebackfilled split, a revised last bar) are
+        reseeded from the panels.
+        """
+        try:
+            with self.indicator_lock:
+                book = self.indicator_book
+                applied = book.update_bars(panels)
+                reseeded = disagreements(book, indicators)
+                if reseeded:
+                    book.reset(reseeded)
+                    book.update_bars({field: frame[reseeded] for field, frame in panels.items()})
+                still_off = disagreements(book, indicators) if reseeded else []
+                book.save()
+            app.logger.info(f"Indicator book: {applied} new bars, {len(reseeded)} tickers reseeded")
+            if still_off:
+                app.logger.warning(f"Streamed indicators disagree with compute_indicators for {', '.join(still_off)}")
+        except Exception as e:
+            app.logger.warning(f"Indicator book update failed: {e}")
 
     def _get_default_data(self):
         return {
@@ -372,17 +476,32 @@ class GoogleSheetsManager:
             return False
 
 class EnhancedGeminiAnalyzer:
-    def __init__(self):
+    def __init__(self, client=None, auto_start=True):
+        # Any object with models.generate_content(model=, contents=, config=) can stand in for the Gemini client
         self.model_name = 'gemini-2.0-flash'
-        self.client = self.setup_gemini()
+        self.client = client if client is not None else self.setup_gemini()
+        self.limiter = RateLimiter()
+        # Finished analyses are reused across runs unless ANALYSIS_CACHE=0
+        self.analysis_cache = AnalysisCache() if os.getenv('ANALYSIS_CACHE', '1') != '0' else None
         self.current_analyses = []
         self.analysis_status = {"status": "idle", "progress": 0, "message": ""}
         self.auto_analysis_running = False
         self.sheets_manager = GoogleSheetsManager()
         self.financial_manager = EnhancedFinancialDataManager()
+        self.short_book = ShortInterestBook()
+        self.universe = load_universe()
+        self.watchlist_mtime = os.path.getmtime(WATCHLIST_PATH)
+        self.universe_mtime = file_mtime(UNIVERSE_PATH)
+        self.universe_rebuild_date = None
+        # Today's CSV and the filtered frame built from it, reused until either changes
+        self.http = requests.Session()
+        self.remote_csv = {}
+        self.announcements_memo = None
+        self.announcements_lock = threading.Lock()
         self.last_sheets_update = None
         self.announcement_date = datetime.today().date()
-        self.start_auto_analysis()
+        if auto_start:
+            self.start_auto_analysis()
 
     def setup_gemini(self):
         api_key = os.getenv('GEMINI_API_KEY')
@@ -412,177 +531,241 @@ class EnhancedGeminiAnalyzer:
             return f"file://{os.path.abspath(filename)}"
         url = f"{base_url}{filename}"
         try:
-            resp = requests.head(url, timeout=5)
-            if resp.status_code == 200:
+            if self.fetch_remote_csv(url) is not None:
                 app.logger.debug(f'Found remote CSV: {url}')
                 return url
-            else:
-                app.logger.debug(f'Remote CSV {url} returned status: {resp.status_code}')
         except requests.RequestException as e:
             app.logger.debug(f'Failed to access remote CSV {url}: {str(e)}')
         app.logger.error(f"No CSV found for {date_str} locally or remotely")
         return None
 
-    def load_announcements_data(self, csv_source):
-        try:
-            if csv_source.startswith('file://'):
-                local_path = csv_source.replace('file://', '')
-                if not os.path.exists(local_path):
-                    app.logger.error(f"Local CSV file not found: {local_path}")
-                    return None
-                df = pd.read_csv(local_path)
-                app.logger.debug(f'Loaded local CSV with {len(df)} rows')
-            else:
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                resp = requests.get(csv_source, headers=headers, timeout=10)
-                resp.raise_for_status()
-                df = pd.read_csv(io.StringIO(resp.text))
-                app.logger.debug(f'Loaded remote CSV with {len(df)} rows')
-
-            if df.empty:
-                app.logger.error(f"CSV is empty: {csv_source}")
-                return None
-
-            allowed_file = 'value.csv'
-            if not os.path.exists(allowed_file):
-                app.logger.error(f"Allowed tickers file not found: {allowed_file}")
-                return None
-
-            allowed_df = pd.read_csv(allowed_file)
-            allowed_tickers = set(
-                allowed_df['Symbol']
-                .dropna()
-                .str.strip()
-                .str.upper()
-            )
-            app.logger.info(f"Loaded {len(allowed_tickers)} allowed tickers from {allowed_file}")
-
-            valid_announcements = df[
-                (df['pdf_url'].notna()) &
-                (df['pdf_url'] != 'No PDF URL found') &
-                (df['pdf_url'].str.startswith('http')) &
-                (df['ticker'].str.strip().str.upper().isin(allowed_tickers))
-            ].copy()
-
-            app.logger.info(f"After watchlist filter: {len(valid_announcements)} announcements")
-
-            # Pre-AI hard filters to reduce Gemini calls
-            def quick_fundamentals(tkr):
-                try:
-                    s = yf.Ticker(f"{tkr}.AX")
-                    info = s.info
-                    mc = info.get('marketCap', np.nan)
-
-                    hist = s.history(period="5d")
-                    if not hist.empty:
-                        last_close = hist['Close'].iloc[-1]
-                        last_vol = hist['Volume'].iloc[-1]
-                        yesterday_value = last_close * last_vol if pd.notna(last_close) and pd.notna(last_vol) else np.nan
-                    else:
-                        yesterday_value = np.nan
-
-                    return mc, yesterday_value
-                except:
-                    return np.nan, np.nan
-
-            keep_mask = pd.Series(True, index=valid_announcements.index)
-            dropped_reasons = {'liquidity': 0, 'market_cap': 0, 'capital_raise': 0, 'biotech_trial': 0}
-
-            for idx, row in valid_announcements.iterrows():
-                tkr = row['ticker']
-                title_lower = str(row.get('title', '')).lower()
-
-                mc, yest_value = quick_fundamentals(tkr)
+    def fetch_remote_csv(self, url):
+        """
+        One conditional GET for url: the copy from the last fetch is
+        revalidated with its ETag/Last-Modified, so an unchanged CSV costs a
+        304. Returns {'text', 'etag', 'last_modified', 'digest'} or None.
+        """
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        cached = self.remote_csv.get(url)
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        resp = self.http.get(url, headers=headers, timeout=10)
+        if resp.status_code == 304 and cached:
+            return cached
+        if resp.status_code != 200:
+            app.logger.debug(f'Remote CSV {url} returned status: {resp.status_code}')
+            return None
 
-                # Liquidity > 300k AUD yesterday
-                if pd.isna(yest_value) or yest_value < 300000:
-                    keep_mask[idx] = False
-                    dropped_reasons['liquidity'] += 1
-                    continue
+        # Only today's file is ever asked for again
+        self.remote_csv = {url: {
+            'text': resp.text,
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'digest': hashlib.sha1(resp.content).hexdigest(),
+        }}
+        return self.remote_csv[url]
+
+    def refresh_universe(self):
+        """
+        Reload the universe when value.csv or the saved build changes. A
+        stale build is rebuilt on a background thread, at most once a day,
+        while requests keep using the last data/universe.json. With no build
+        at all (a fresh server or a cache miss) there is nothing to serve, so
+        that first build runs here.
+        """
+        watchlist_mtime = os.path.getmtime(WATCHLIST_PATH)
+        universe_mtime = file_mtime(UNIVERSE_PATH)
+        if (watchlist_mtime, universe_mtime) != (self.watchlist_mtime, self.universe_mtime):
+            app.logger.info("value.csv or universe.json changed - reloading ticker universe")
+            self.universe = load_universe()
+            self.watchlist_mtime = watchlist_mtime
+            self.universe_mtime = universe_mtime
+        today = datetime.now(pytz.timezone("Australia/Sydney")).date()
+        if not self.universe.stale or self.universe_rebuild_date == today:
+            return
+        self.universe_rebuild_date = today
+        if self.universe.built_at is None:
+            app.logger.warning("Ticker universe has never been built - building it now")
+            universe = self.run_universe_build()
+            if universe is not None:
+                self.universe, self.universe_mtime = universe
+        else:
+            app.logger.info("Ticker universe is stale - rebuilding in the background")
+            threading.Thread(target=self.rebuild_universe, daemon=True, name="universe-rebuild").start()
 
-                # Market cap 20M – 3B AUD
-                if pd.isna(mc) or not (20000000 <= mc <= 3000000000):
-                    keep_mask[idx] = False
-                    dropped_reasons['market_cap'] += 1
-                    continue
+    def run_universe_build(self):
+        """(universe, universe.json mtime) from a fresh build, or None if it failed"""
+        try:
+            universe = build_universe(price_store=self.financial_manager.price_store)
+        except Exception as e:
+            app.logger.error(f"Ticker universe build failed: {str(e)}")
+            return None
+        app.logger.info(f"Ticker universe built at {universe.built_at}")
+        return universe, file_mtime(UNIVERSE_PATH)
 
-                # Capital raise keywords
-                capital_keywords = [
-                    'placement', 'entitlement', 'rights issue', 'spp', 'share purchase plan',
-                    'capital raising', 'capital raise', 'prospectus', 'offer', 'dilution',
-                    'renounceable', 'non-renounceable', 'equity raising', 'bookbuild'
-                ]
-                if any(kw in title_lower for kw in capital_keywords):
-                    keep_mask[idx] = False
-                    dropped_reasons['capital_raise'] += 1
-                    continue
+    def rebuild_universe(self):
+        built = self.run_universe_build()
+        if built is not None:
+            with self.announcements_lock:
+                self.universe, self.universe_mtime = built
 
-                # Early biotech / trial keywords
-                biotech_keywords = [
-                    'phase 1', 'phase 2', 'phase 3', 'phase ii', 'phase iii',
-                    'clinical trial', 'trial result', 'dosing', 'enrolment', 'cohort',
-                    'first patient', 'top-line data', 'interim data', 'tga approval'
-                ]
-                if any(kw in title_lower for kw in biotech_keywords):
-                    keep_mask[idx] = False
-                    dropped_reasons['biotech_trial'] += 1
-                    continue
+    def load_announcements_data(self, csv_source):
+        """
+        Filtered announcements for csv_source, memoised per trading day on
+        the CSV version (ETag/Last-Modified or local mtime), value.csv's
+        mtime and the universe build. Dashboard reloads reuse the frame.
+        """
+        try:
+            with self.announcements_lock:
+                self.refresh_universe()
+                if csv_source.startswith('file://'):
+                    local_path = csv_source.replace('file://', '')
+                    if not os.path.exists(local_path):
+                        app.logger.error(f"Local CSV file not found: {local_path}")
+                        return None
+                    stat = os.stat(local_path)
+                    version = (stat.st_mtime_ns, stat.st_size)
+                    remote = None
+                else:
+                    remote = self.remote_csv.get(csv_source) or self.fetch_remote_csv(csv_source)
+                    if remote is None:
+                        app.logger.error(f"Remote CSV not available: {csv_source}")
+                        return None
+                    version = (remote['etag'], remote['last_modified'], remote['digest'])
+
+                key = (datetime.now(pytz.timezone("Australia/Sydney")).date(), csv_source, version,
+                       self.watchlist_mtime, self.universe.built_at)
+                if self.announcements_memo and self.announcements_memo[0] == key:
+                    app.logger.debug(f'Announcements unchanged - reusing filtered frame for {csv_source}')
+                    frame = self.announcements_memo[1]
+                else:
+                    if remote is None:
+                        df = pd.read_csv(local_path)
+                        app.logger.debug(f'Loaded local CSV with {len(df)} rows')
+                    else:
+                        df = pd.read_csv(io.StringIO(remote['text']))
+                        app.logger.debug(f'Loaded remote CSV with {len(df)} rows')
+                    frame = self.filter_announcements(df, csv_source)
+                    self.announcements_memo = (key, frame)
 
-            valid_announcements = valid_announcements[keep_mask].copy()
+            return frame.copy() if frame is not None else None
 
-            app.logger.info(
-                f"After pre-AI filters: {len(valid_announcements)} remain "
-                f"(dropped: liquidity={dropped_reasons['liquidity']}, "
-                f"market_cap={dropped_reasons['market_cap']}, "
-                f"capital_raise={dropped_reasons['capital_raise']}, "
-                f"biotech_trial={dropped_reasons['biotech_trial']})"
-            )
+        except Exception as e:
+            app.logger.error(f"Error loading CSV {csv_source}: {str(e)}")
+            return None
 
-            if valid_announcements.empty:
-                app.logger.warning(f"No announcements remain after filtering")
-                return None
+    def filter_announcements(self, df, csv_source):
+        if df.empty:
+            app.logger.error(f"CSV is empty: {csv_source}")
+            return None
 
-            # Drop duplicate tickers — keep highest sentiment score per ticker
-            if 'sentiment_score' in valid_announcements.columns:
-                valid_announcements = valid_announcements.sort_values('sentiment_score', ascending=False)
-            valid_announcements = valid_announcements.drop_duplicates(subset=['ticker'], keep='first')
+        # Universe and its daily attributes: filters below are lookups, not yf calls
+        universe = self.universe
+        if not len(universe):
+            app.logger.error("Ticker universe is empty - check value.csv")
+            return None
+        if universe.built_at is None:
+            # Without market cap and traded value every row would fail the liquidity filter
+            app.logger.error("Ticker universe not built (no data/universe.json) - "
+                             "run 'python ticker_universe.py build'; skipping analysis")
+            return None
+        app.logger.info(f"Loaded {len(universe)} allowed tickers (universe built {universe.built_at})")
+
+        valid_announcements = df[
+            (df['pdf_url'].notna()) &
+            (df['pdf_url'] != 'No PDF URL found') &
+            (df['pdf_url'].str.startswith('http')) &
+            (df['ticker'].str.strip().str.upper().isin(universe.tickers))
+        ].copy()
+
+        app.logger.info(f"After watchlist filter: {len(valid_announcements)} announcements")
+
+        # Pre-AI hard filters to reduce Gemini calls
+        keep_mask = pd.Series(True, index=valid_announcements.index)
+        dropped_reasons = {'liquidity': 0, 'market_cap': 0, 'capital_raise': 0, 'biotech_trial': 0}
+
+        # Keyword categories for the whole title column in one batch
+        title_categories = pd.Series(
+            [{category for category, _, _ in hits}
+             for hits in PREFILTER_MATCHER.find_many(valid_announcements['title'].fillna('').astype(str))],
+            index=valid_announcements.index
+        )
+
+        for idx, row in valid_announcements.iterrows():
+            tkr = row['ticker']
+            categories = title_categories[idx]
+
+            record = universe.get(tkr) or {}
+            mc = record.get('market_cap')
+            yest_value = record.get('last_traded_value')
+
+            # Liquidity > 300k AUD yesterday
+            if yest_value is None or yest_value < 300000:
+                keep_mask[idx] = False
+                dropped_reasons['liquidity'] += 1
+                continue
+
+            # Market cap 20M – 3B AUD
+            if mc is None or not (20000000 <= mc <= 3000000000):
+                keep_mask[idx] = False
+                dropped_reasons['market_cap'] += 1
+                continue
+
+            # Capital raise keywords
+            if 'capital_raise' in categories:
+                keep_mask[idx] = False
+                dropped_reasons['capital_raise'] += 1
+                continue
+
+            # Early biotech / trial keywords
+            if 'biotech_trial' in categories:
+                keep_mask[idx] = False
+                dropped_reasons['biotech_trial'] += 1
+                continue
+
+        valid_announcements = valid_announcements[keep_mask].copy()
+
+        app.logger.info(
+            f"After pre-AI filters: {len(valid_announcements)} remain "
+            f"(dropped: liquidity={dropped_reasons['liquidity']}, "
+            f"market_cap={dropped_reasons['market_cap']}, "
+            f"capital_raise={dropped_reasons['capital_raise']}, "
+            f"biotech_trial={dropped_reasons['biotech_trial']})"
+        )
+
+        if valid_announcements.empty:
+            app.logger.warning(f"No announcements remain after filtering")
+            return None
 
-            app.logger.info(f"Ready to analyze {len(valid_announcements)} stocks (after dedup)")
-            return valid_announcements
+        # Drop duplicate tickers — keep highest sentiment score per ticker
+        if 'sentiment_score' in valid_announcements.columns:
+            valid_announcements = valid_announcements.sort_values('sentiment_score', ascending=False)
+        valid_announcements = valid_announcements.drop_duplicates(subset=['ticker'], keep='first')
 
-        except Exception as e:
-            app.logger.error(f"Error loading CSV {csv_source}: {str(e)}")
-            return None
+        app.logger.info(f"Ready to analyze {len(valid_announcements)} stocks (after dedup)")
+        return valid_announcements
 
     def download_pdf(self, url):
+        """The announcement PDF's bytes, trimmed for long reports, or None"""
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            resp = requests.get(url, headers=headers, timeout=30)
-            resp.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                tmp_file.write(resp.content)
-                return tmp_file.name
+            pdf_bytes = download_pdf(url, session=self.http)
+        except PdfTooLarge as e:
+            app.logger.warning(f"Skipping PDF: {e}")
+            return None
         except Exception as e:
             app.logger.error(f"Error downloading PDF: {e}")
             return None
+        trimmed, kept, total = trim_pdf(pdf_bytes)
+        if kept is not None and kept < total:
+            app.logger.info(f"Trimmed {url} to {kept} of {total} pages "
+                            f"({len(pdf_bytes)//1024}KB -> {len(trimmed)//1024}KB)")
+        return trimmed
 
-    def analyze_pdf_with_gemini(self, pdf_path, ticker, title, financial_data):
-        # Inline base64 — avoids the File API (v1beta-only) so we can use v1 + gemini-1.5-flash
-        try:
-            with open(pdf_path, 'rb') as f:
-                pdf_bytes = f.read()
-            pdf_part = genai_types.Part(
-                inline_data=genai_types.Blob(
-                    mime_type='application/pdf',
-                    data=base64.b64encode(pdf_bytes).decode('utf-8')
-                )
-            )
-            app.logger.info(f"Loaded PDF for {ticker} ({len(pdf_bytes)//1024}KB inline)")
-        except Exception as load_error:
-            app.logger.error(f"PDF load failed for {ticker}: {load_error}")
-            return None
-
-        # Build prompt once — no need to rebuild on every retry
+    def _financial_summary(self, ticker, financial_data):
         def format_value(value, suffix=''):
             if isinstance(value, (int, float)) and not pd.isna(value):
                 if suffix == '$':
@@ -599,6 +782,11 @@ class EnhancedGeminiAnalyzer:
         bb_w = financial_data['bb_width_pct']
         bb_label = 'SQUEEZE (coiling)' if isinstance(bb_w, float) and bb_w < 5 else 'Normal'
 
+        # Market-wide ASIC short positions: one daily download, then dictionary lookups
+        short_report = self.short_book.ensure_loaded()
+        short_change = self.short_book.change(ticker)
+        short_change_label = f"{short_change:+.2f} pts vs prior report" if short_change is not None else 'no prior report'
+
         financial_summary = f"""
 **Current Financial Position:**
 - Ticker: {ticker}
@@ -623,6 +811,7 @@ class EnhancedGeminiAnalyzer:
 **Short Squeeze Indicators:**
 - Short % of Float: {format_value(financial_data['shares_short_pct_float'], '%')}
 - Short Ratio (days to cover): {financial_data['short_ratio']}
+- ASIC Reported Short Position: {self.short_book.format(ticker)} ({short_change_label}, report {short_report or 'N/A'})
 **Valuation Metrics:**
 - Market Cap: {format_value(financial_data['market_cap'], '$')}
 - P/E Ratio: {format_value(financial_data['pe_ratio'])}
@@ -635,76 +824,214 @@ class EnhancedGeminiAnalyzer:
 - 52W High Distance: {format_value(financial_data['price_to_52w_high_pct'], '%')}
 - 52W Low Distance: {format_value(financial_data['price_to_52w_low_pct'], '%')}
 """
+        return financial_summary
 
-        prompt = f"""
+    def _analysis_prompt(self, ticker, title, financial_summary):
+        return f"""
 Analyze the attached PDF announcement for ASX stock {ticker} titled "{title}".
 {financial_summary}
 
-**Your Goal:** Identify whether this stock is about to make a significant move (5%+, ideally 10%+).
-
-**Analysis Steps:**
-1. **Catalyst Quality**: What is the core news? Is it a takeover bid, record earnings beat, major contract, significant discovery, or guidance upgrade? Rate how material this is.
-2. **Surprise Factor**: Does this news deviate significantly from what the market expected? Unexpected positives cause the biggest moves.
-3. **Technical Setup**: Given the Breakout Score, RSI zone, BB squeeze, and MACD signal — is the stock technically ready to explode? A coiling setup + strong catalyst = rocket.
-4. **Short Squeeze Potential**: High short % of float + positive catalyst = forced short covering amplifies the move. Assess this.
-5. **Retail FOMO Trigger**: Is this the type of news that retail investors will pile into? (Takeovers, record profits, gold/resource discoveries, brand-name companies beating expectations)
-6. **Volume Momentum**: Is smart money already accumulating (5-day volume trend elevated)?
-7. **Quantitative Prediction**: Estimate next-day % price change. Be aggressive and realistic — do not be conservative if the setup is genuinely strong.
+{ANALYSIS_STEPS}
 
 Output **strictly** in JSON with these exact keys (no extra text, no markdown):
-{{
-  "bullish_score": <1-10 integer>,
-  "explosive_move_potential": <1-10 integer where 10=near-certain 10%+ move, 7+=strong candidate>,
-  "rocket_thesis": <string: max 2 sentences explaining specifically WHY this could be a multi-percent mover — catalyst + technical setup + squeeze potential>,
-  "key_positive_factors": <string>,
-  "financial_highlights": <string>,
-  "future_outlook": <string>,
-  "market_impact": <string>,
-  "risk_factors": <string>,
-  "market_expectations_comparison": <string>,
-  "surprise_level": <"low" | "medium" | "high">,
-  "expected_daily_change_pct": <float>,
-  "prediction_confidence": <1-5 integer>,
-  "reasoning_summary": <string>
-}}
+{ANALYSIS_FORMAT}
 """
 
-        # Retry only the generate_content call — file is already uploaded
-        retries = 5
-        delay = 60  # start at 60s to ensure the RPM window resets
-        result = None
+    def _batch_contents(self, batch):
+        """One request for several announcements: each heading and financial summary, then its PDF"""
+        contents = [f"""
+Analyze each of the {len(batch)} ASX announcements below independently. Each one's ticker, title and financial position are followed by its PDF.
+"""]
+        for number, item in enumerate(batch, 1):
+            contents.append(f"""
+### Announcement {number}: ASX stock {item['ticker']} titled "{item['title']}"
+{item['summary']}""")
+            contents.append(genai_types.Part.from_bytes(data=item['pdf_bytes'], mime_type='application/pdf'))
+        contents.append(f"""
+For each announcement:
+
+{ANALYSIS_STEPS}
+
+Output **strictly** a JSON array with one object per announcement, in the order given (no extra text, no markdown). Each object has "ticker": <the announcement's ticker> plus these exact keys:
+{ANALYSIS_FORMAT}
+""")
+        return contents
+
+    def _prepare_analysis(self, pdf_bytes, ticker, title, financial_data):
+        """Everything one announcement contributes to a Gemini request, and its cache key"""
+        summary = self._financial_summary(ticker, financial_data)
+        return {
+            'ticker': ticker,
+            'title': title,
+            'pdf_bytes': pdf_bytes,
+            'summary': summary,
+            'tokens': estimate_tokens(summary, pdf_bytes),
+            # The same PDF bytes under the same model, prompt and financial inputs give the same answer
+            'pdf_hash': sha256(pdf_bytes),
+            'inputs': dict(financial_data, ticker=ticker, title=title,
+                           asic_short_position=self.short_book.format(ticker)),
+        }
 
+    def _cached_analysis(self, item):
+        if self.analysis_cache is None:
+            return None
+        cached = self.analysis_cache.lookup(item['pdf_hash'], self.model_name, PROMPT_VERSION, item['inputs'])
+        if cached is not None:
+            app.logger.info(f"Reusing cached analysis for {item['ticker']} ({item['pdf_hash'][:12]})")
+        return cached
+
+    def _store_analysis(self, item, result):
+        if self.analysis_cache is not None:
+            self.analysis_cache.store(item['pdf_hash'], self.model_name, PROMPT_VERSION, item['inputs'], result,
+                                      ticker=item['ticker'], title=item['title'])
+
+    def _generate(self, contents, estimated_tokens, label, parse, config=None, retries=5):
+        """
+        parse() of the response text from one generate_content call, or None
+        once every attempt has failed. The limiter spaces calls to the quota,
+        so a retry waits only as long as the server's retryDelay (or the
+        budget) requires. An incomplete answer is re-asked at once; other
+        errors retry after 5s.
+        """
         for i in range(retries):
             try:
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=[pdf_part, prompt]
-                )
-                response_text = response.text.strip()
-                if response_text.startswith('```json'):
-                    response_text = response_text[7:-3].strip()
-                elif response_text.startswith('```'):
-                    response_text = response_text[3:-3].strip()
-                result = json.loads(response_text)
-                app.logger.info(f"Successfully analyzed {ticker}")
-                break
+                with self.limiter.slot(estimated_tokens) as slot:
+                    response = self.client.models.generate_content(
+                        model=self.model_name,
+                        contents=contents,
+                        config=config
+                    )
+                    usage = getattr(response, 'usage_metadata', None)
+                    slot.tokens = getattr(usage, 'total_token_count', None)
+                self.limiter.succeeded()
+                return parse(response.text or '')
+            except QuotaExhausted as e:
+                app.logger.error(f"Skipping {label}: {e}")
+                return None
+            except IncompleteAnalysis as e:
+                app.logger.warning(f"Incomplete analysis for {label} ({e}); re-asking ({i+1}/{retries})")
             except Exception as e:
-                error_str = str(e).lower()
-                if "429" in error_str or "quota" in error_str or "rate limit" in error_str or "resource_exhausted" in error_str:
-                    app.logger.warning(f"Rate limit hit for {ticker}: {e}. Waiting {delay}s ({i+1}/{retries})")
-                    time.sleep(delay)
-                    delay = min(delay * 2, 120)
+                if is_rate_limit_error(e):
+                    delay = self.limiter.throttle(e)
+                    app.logger.warning(f"Rate limit hit for {label}: {e}. Pausing Gemini calls {delay:.0f}s ({i+1}/{retries})")
                 else:
-                    app.logger.error(f"Analysis error for {ticker} (attempt {i+1}): {e}")
+                    app.logger.error(f"Analysis error for {label} (attempt {i+1}): {e}")
                     if i == retries - 1:
                         break
                     time.sleep(5)
 
-        if result is None:
-            app.logger.error(f"Failed to analyze {ticker} after {retries} attempts")
+        app.logger.error(f"Failed to analyze {label} after {retries} attempts")
+        return None
+
+    def analyze_pdf_with_gemini(self, pdf_bytes, ticker, title, financial_data):
+        return self._analyze_one(self._prepare_analysis(pdf_bytes, ticker, title, financial_data))
+
+    def _analyze_one(self, item):
+        cached = self._cached_analysis(item)
+        if cached is not None:
+            return cached
+
+        # Inline bytes — avoids the File API (v1beta-only); the SDK encodes them once when sending
+        ticker = item['ticker']
+        pdf_part = genai_types.Part.from_bytes(data=item['pdf_bytes'], mime_type='application/pdf')
+        app.logger.info(f"Loaded PDF for {ticker} ({len(item['pdf_bytes'])//1024}KB inline)")
+        prompt = self._analysis_prompt(ticker, item['title'], item['summary'])
+
+        # Usable fields from incomplete answers are kept, so a re-ask only has to supply the rest
+        salvaged = {}
 
+        def parse(text):
+            try:
+                return parse_analysis(text)
+            except IncompleteAnalysis as e:
+                salvaged.update(e.partial)
+                analysis, missing = validate(salvaged)
+                if missing:
+                    raise IncompleteAnalysis(missing, dict(salvaged))
+                return analysis
+
+        result = self._generate([pdf_part, prompt], estimate_tokens(prompt, item['pdf_bytes']), ticker, parse,
+                                config=ANALYSIS_CONFIG)
+        if result is not None:
+            app.logger.info(f"Successfully analyzed {ticker}")
+            self._store_analysis(item, result)
         return result
 
+    def _plan_batches(self, items):
+        """
+        Consecutive groups of at most BATCH_MAX_ITEMS announcements whose
+        estimated tokens fit BATCH_MAX_TOKENS and the limiter's per-minute
+        budget, and whose PDFs together fit Gemini's inline request size.
+        """
+        token_budget = min(BATCH_MAX_TOKENS, self.limiter.tpm)
+        batches, batch, tokens, size = [], [], 0, 0
+        for item in items:
+            fits = (len(batch) < BATCH_MAX_ITEMS
+                    and tokens + item['tokens'] <= token_budget
+                    and size + len(item['pdf_bytes']) <= MAX_PDF_BYTES
+                    and all(other['ticker'] != item['ticker'] for other in batch))
+            if batch and not fits:
+                batches.append(batch)
+                batch, tokens, size = [], 0, 0
+            batch.append(item)
+            tokens += item['tokens']
+            size += len(item['pdf_bytes'])
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _analyze_group(self, batch):
+        if len(batch) == 1:
+            result = self._analyze_one(batch[0])
+            return {batch[0]['ticker']: result} if result is not None else {}
+
+        tickers = [item['ticker'] for item in batch]
+        contents = self._batch_contents(batch)
+        estimated = sum(item['tokens'] for item in batch) + estimate_tokens(contents[0] + contents[-1])
+        app.logger.info(f"Analyzing batch {', '.join(tickers)} in one request (~{estimated} tokens)")
+        parsed = self._generate(contents, estimated, f"batch {', '.join(tickers)}",
+                                lambda text: parse_batch_response(text, tickers),
+                                config=BATCH_ANALYSIS_CONFIG, retries=3) or {}
+
+        results = {}
+        for item in batch:
+            result = parsed.get(item['ticker'].upper())
+            if result is not None:
+                self._store_analysis(item, result)
+            else:
+                # Missing or malformed in the batch answer: ask for this one alone
+                app.logger.warning(f"Batch response had no usable analysis for {item['ticker']}; retrying it alone")
+                result = self._analyze_one(item)
+            if result is not None:
+                results[item['ticker']] = result
+        return results
+
+    def analyze_batch(self, items):
+        """
+        {ticker: analysis} for items ({'ticker', 'title', 'pdf_bytes',
+        'financial_data'}). Cached analyses are reused; the rest are packed
+        into multi-announcement requests sized to the token budget, run
+        concurrently under the limiter. Announcements a batch response leaves
+        unparsed are retried one by one.
+        """
+        results = {}
+        pending = []
+        for raw in items:
+            item = self._prepare_analysis(raw['pdf_bytes'], raw['ticker'], raw['title'], raw['financial_data'])
+            cached = self._cached_analysis(item)
+            if cached is not None:
+                results[item['ticker']] = cached
+            else:
+                pending.append(item)
+
+        batches = self._plan_batches(pending)
+        if batches:
+            app.logger.info(f"{len(pending)} announcements to analyze in {len(batches)} Gemini requests")
+            with ThreadPoolExecutor(max_workers=self.limiter.max_concurrent) as pool:
+                for parsed in pool.map(self._analyze_group, batches):
+                    results.update(parsed)
+        return results
+
     def create_results_csv(self):
         try:
             csv_data = []
@@ -872,42 +1199,79 @@ Output **strictly** in JSON with these exact keys (no extra text, no markdown):
         valid_announcements = df.head(max_analyze)
         total = len(valid_announcements)
 
-        for idx, (_, row) in enumerate(valid_announcements.iterrows()):
-            ticker = row['ticker']
-            title = row['title']
-            pdf_url = row['pdf_url']
-            short_interest = row.get('short_interest', '')
-
-            self.analysis_status["message"] = f"Analyzing {ticker}: {title}"
-            self.analysis_status["progress"] = int((idx / total) * 70)
-
-            financial_data = self.financial_manager.get_comprehensive_stock_data(ticker)
-            intraday_data = self.financial_manager.get_intraday_data(ticker, self.announcement_date)
-
-            self.analysis_status["progress"] = int((idx / total) * 80)
-
-            pdf_path = self.download_pdf(pdf_url)
-            if pdf_path:
-                analysis = self.analyze_pdf_with_gemini(pdf_path, ticker, title, financial_data)
-                if analysis:
-                    self.current_analyses.append({
-                        'ticker': ticker,
-                        'title': title,
-                        'url': pdf_url,
-                        'short_interest': short_interest,
-                        'financial_data': financial_data,
-                        'intraday_data': intraday_data,
-                        'analysis': analysis
-                    })
-                try:
-                    os.unlink(pdf_path)
-                except:
-                    pass
-
-            # Wait between stocks so the Gemini RPM window has time to recover
-            if idx < total - 1:
-                app.logger.info(f"Waiting 60s before next stock to respect rate limits...")
-                time.sleep(60)
+        cache_before = self.analysis_cache.stats() if self.analysis_cache is not None else None
+
+        # Stages overlap: PDFs download while the market snapshot (one batched fetch for
+        # every ticker) is built, and Gemini works through ready stocks while the rest
+        # are still downloading. Bounded queues keep a slow stage from piling up PDFs.
+        self.analysis_status["message"] = f"Fetching market data and announcements for {total} stocks..."
+        snapshot_ready = threading.Event()
+
+        def snapshot():
+            try:
+                self.financial_manager.prefetch(valid_announcements['ticker'], self.announcement_date)
+            except Exception as e:
+                app.logger.warning(f"Market snapshot failed, fetching per stock instead: {e}")
+            finally:
+                snapshot_ready.set()
+
+        def download(item):
+            item['pdf_bytes'] = self.download_pdf(item['url'])
+            return item if item['pdf_bytes'] else None
+
+        def market_data(item):
+            snapshot_ready.wait()
+            item['financial_data'] = self.financial_manager.get_comprehensive_stock_data(item['ticker'])
+            item['intraday_data'] = self.financial_manager.get_intraday_data(item['ticker'], self.announcement_date)
+            return item
+
+        def analyze(batch):
+            analyses = self.analyze_batch(batch)
+            results = []
+            for item in batch:
+                item.pop('pdf_bytes')
+                analysis = analyses.get(item['ticker'])
+                results.append(dict(item, analysis=analysis) if analysis else None)
+            return results
+
+        finished = []
+
+        def progress(item):
+            finished.append(item['ticker'])
+            self.analysis_status["message"] = f"Analyzed {item['ticker']}: {item['title']}"
+            self.analysis_status["progress"] = 10 + int(len(finished) / total * 70)
+
+        stages = [
+            Stage("download", download, workers=PDF_WORKERS),
+            Stage("market_data", market_data, workers=MARKET_DATA_WORKERS),
+            Stage("analyze", analyze, workers=self.limiter.max_concurrent,
+                  batch_size=BATCH_MAX_ITEMS, batch_wait=BATCH_WAIT),
+        ]
+        items = [
+            {
+                'index': index,
+                'ticker': row['ticker'],
+                'title': row['title'],
+                'url': row['pdf_url'],
+                'short_interest': row.get('short_interest', ''),
+            }
+            for index, (_, row) in enumerate(valid_announcements.iterrows())
+        ]
+        threading.Thread(target=snapshot, daemon=True).start()
+        started = time.perf_counter()
+        analysed = run_pipeline(items, stages, on_output=progress, logger=app.logger)
+        self.current_analyses = [
+            {key: value for key, value in item.items() if key != 'index'}
+            for item in sorted(analysed, key=lambda item: item['index'])
+        ]
+        self.analysis_status["progress"] = 80
+        app.logger.info(f"Pipeline finished in {time.perf_counter() - started:.1f}s: "
+                        f"{ {stage.name: stage.stats() for stage in stages} }")
+        app.logger.info(f"Gemini limiter: {self.limiter.stats()}")
+        cache_hits = 0
+        if cache_before is not None:
+            cache_hits = self.analysis_cache.stats()['hits'] - cache_before['hits']
+            app.logger.info(f"Analysis cache: {cache_hits} of {total} stocks reused a stored analysis")
 
         def rocket_score(item):
             a = item['analysis']
@@ -947,7 +1311,8 @@ Output **strictly** in JSON with these exact keys (no extra text, no markdown):
         self.analysis_status = {
             "status": "complete",
             "progress": 100,
-            "message": f"Analysis complete – {len(self.current_analyses)} stocks processed"
+            "message": f"Analysis complete – {len(self.current_analyses)} stocks processed",
+            "cache_hits": cache_hits
         }
 
 # Flask API endpoints
@@ -1011,6 +1376,23 @@ def get_results():
         "results": results
     })
 
+@app.route('/api/cache_stats')
+def get_cache_stats():
+    global analyzer
+    return jsonify(analyzer.financial_manager.cache.stats())
+
+@app.route('/api/rate_limit')
+def get_rate_limit():
+    global analyzer
+    return jsonify(analyzer.limiter.stats())
+
+@app.route('/api/analysis_cache')
+def get_analysis_cache():
+    global analyzer
+    if analyzer.analysis_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(analyzer.analysis_cache.stats())
+
 @app.route('/api/financial_data/<ticker>')
 def get_financial_data(ticker):
     global analyzer
@@ -0,0 +1,196 @@
+# coding: utf-8
+"""
+Client-side Gemini quota: requests per minute, tokens per minute and
+requests per day, plus a cap on concurrent calls. Callers block only as long
+as the budget requires, and a 429's retryDelay pauses every caller until the
+server says to resume.
+
+    limiter = RateLimiter()
+    with limiter.slot(estimated_tokens) as slot:
+        response = client.models.generate_content(...)
+        slot.tokens = response.usage_metadata.total_token_count
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+# Free-tier gemini-2.0-flash limits; override to match the key's quota
+RPM = int(os.getenv("GEMINI_RPM", "15"))
+TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+RPD = int(os.getenv("GEMINI_RPD", "200"))
+MAX_CONCURRENT = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+# Pause after a 429 that carries no retryDelay, doubled on each repeat
+DEFAULT_BACKOFF = 30
+MAX_BACKOFF = 120
+# Daily quotas reset at midnight Pacific time
+QUOTA_TZ = pytz.timezone("America/Los_Angeles")
+
+_RETRY_DELAY_RE = re.compile(r"retry(?:_?delay['\"]?\s*[:=]\s*['\"]?| in )(\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-z])")
+
+# Gemini bills each PDF page as an image of about this many tokens
+TOKENS_PER_PDF_PAGE = 258
+
+
+class QuotaExhausted(Exception):
+    """The requests-per-day budget is spent until the next Pacific midnight"""
+
+
+def is_rate_limit_error(error):
+    if getattr(error, "code", None) == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "quota" in text or "rate limit" in text or "resource_exhausted" in text
+
+
+def retry_delay(error):
+    """Seconds from a 429's RetryInfo (retryDelay: '27s' / 'Please retry in 27.3s'), or None"""
+    match = _RETRY_DELAY_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def estimate_tokens(prompt, pdf_bytes=b""):
+    """Rough request size: ~4 characters per prompt token plus a flat cost per PDF page"""
+    pages = len(_PAGE_RE.findall(pdf_bytes)) or (1 if pdf_bytes else 0)
+    return len(prompt) // 4 + pages * TOKENS_PER_PDF_PAGE
+
+
+class _Slot:
+    def __init__(self, limiter, tokens):
+        self.limiter = limiter
+        self.estimated = tokens
+        # Set to the response's actual token count to correct the estimate
+        self.tokens = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter._release(self)
+        return False
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens, refilled continuously at the
+    per-minute rates, and a per-day request counter. slot() blocks until a
+    request of the estimated size fits every budget and a concurrency slot is
+    free.
+    """
+
+    def __init__(self, rpm=RPM, tpm=TPM, rpd=RPD, max_concurrent=MAX_CONCURRENT):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.max_concurrent = max_concurrent
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._refilled = time.monotonic()
+        self._day = self._quota_day()
+        self._day_count = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._backoff = DEFAULT_BACKOFF
+        self._cond = threading.Condition()
+        self.calls = 0
+        self.waited = 0.0
+        self.throttled = 0
+
+    @staticmethod
+    def _quota_day():
+        return datetime.now(QUOTA_TZ).date()
+
+    def _refill(self, now):
+        elapsed = now - self._refilled
+        self._refilled = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+        day = self._quota_day()
+        if day != self._day:
+            self._day, self._day_count = day, 0
+
+    def _wait_time(self, now, tokens):
+        """Seconds until a request of this size may start, 0 if it can start now"""
+        waits = [self._paused_until - now]
+        if self._requests < 1:
+            waits.append((1 - self._requests) * 60 / self.rpm)
+        if self._tokens < tokens:
+            waits.append((tokens - self._tokens) * 60 / self.tpm)
+        return max(waits)
+
+    def slot(self, tokens=0):
+        """Context manager around one generate_content call; see the module docstring"""
+        # A request larger than the whole minute's budget would never fit
+        tokens = min(tokens, self.tpm)
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._day_count >= self.rpd:
+                    raise QuotaExhausted(f"Gemini daily quota of {self.rpd} requests used")
+                wait = self._wait_time(now, tokens)
+                if wait <= 0 and self._in_flight < self.max_concurrent:
+                    break
+                # Releases and pauses notify; otherwise wake when the buckets have refilled
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._requests -= 1
+            self._tokens -= tokens
+            self._day_count += 1
+            self._in_flight += 1
+            self.calls += 1
+            self.waited += time.monotonic() - started
+        return _Slot(self, tokens)
+
+    def _release(self, slot):
+        with self._cond:
+            self._in_flight -= 1
+            if slot.tokens is not None:
+                # Refund or charge the difference between the estimate and actual use
+                self._tokens = min(self.tpm, self._tokens + slot.estimated - slot.tokens)
+            self._cond.notify_all()
+
+    def throttle(self, error):
+        """
+        Record a 429: every caller pauses for the server's retryDelay, or an
+        exponential backoff when it gives none. Returns the pause in seconds.
+        """
+        delay = retry_delay(error)
+        with self._cond:
+            if delay is None:
+                delay = self._backoff
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+            else:
+                self._backoff = DEFAULT_BACKOFF
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            # The server's view of the minute is authoritative: spend the local request budget too
+            self._requests = min(self._requests, 0.0)
+            self.throttled += 1
+            self._cond.notify_all()
+        return delay
+
+    def succeeded(self):
+        with self._cond:
+            self._backoff = DEFAULT_BACKOFF
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "rpd": self.rpd,
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "requests_available": round(self._requests, 2),
+                "tokens_available": int(self._tokens),
+                "requests_today": self._day_count,
+                "paused_for": round(max(self._paused_until - time.monotonic(), 0.0), 1),
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited, 1),
+            }
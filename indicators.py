@@ -0,0 +1,521 @@
+# coding: utf-8
+"""
+Vectorised technical indicators for many tickers at once.
+
+Inputs are date x ticker panels (PriceStore.panels). Each ticker's own bars
+are right-aligned first, so bar-count windows (last 20 bars, 14-bar RSI,
+26-bar EMA) give the same values as a per-ticker calculation even when
+tickers have gaps on different dates. Every indicator is a handful of NumPy
+operations over the whole (bars x tickers) array.
+
+The streaming classes at the end keep the same indicators as running state
+per ticker for live intraday refreshes: each new bar is an O(1) update and
+the whole watchlist's state checkpoints to data/indicator_state.json.
+gem20's market snapshot feeds the book its new daily bars and checks it
+against compute_indicators (disagreements).
+"""
+import json
+import os
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW = 20
+# A squeeze needs at least this many past band widths to compare against
+BB_MIN_HISTORY = 10
+
+CHECKPOINT_PATH = os.getenv("INDICATOR_STATE_PATH", os.path.join("data", "indicator_state.json"))
+
+
+def right_align(panels):
+    """
+    (tickers, {field: bars x tickers array}) with each ticker's bars (rows
+    with a Close) moved to the bottom in date order and NaN above them.
+    """
+    close = panels["Close"]
+    tickers = list(close.columns)
+    valid = close.notna().to_numpy()
+    # Stable sort on the validity flag: gaps first, bars after in their original order
+    order = np.argsort(valid, axis=0, kind="stable")
+    aligned_valid = np.take_along_axis(valid, order, axis=0)
+    aligned = {}
+    for field, frame in panels.items():
+        values = frame.reindex(index=close.index, columns=tickers).to_numpy(dtype=float)
+        values = np.take_along_axis(values, order, axis=0)
+        values[~aligned_valid] = np.nan
+        aligned[field] = values
+    return tickers, aligned
+
+
+def _bar(values, back):
+    """Row `back` bars from the end (1 = last), NaN where there are too few bars"""
+    if values.shape[0] < back:
+        return np.full(values.shape[1], np.nan)
+    return values[-back]
+
+
+def _nanmean(values, axis=0):
+    count = np.sum(~np.isnan(values), axis=axis)
+    total = np.nansum(values, axis=axis)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _nanstd(values, axis=0):
+    """Sample standard deviation (ddof=1), NaN with fewer than two values"""
+    count = np.sum(~np.isnan(values), axis=axis)
+    mean = _nanmean(values, axis=axis)
+    squares = np.nansum((values - np.expand_dims(mean, axis)) ** 2, axis=axis)
+    return np.where(count > 1, np.sqrt(squares / np.maximum(count - 1, 1)), np.nan)
+
+
+def ema(values, span):
+    """EMA down each column (pandas ewm(span, adjust=False)), starting at its first bar"""
+    alpha = 2.0 / (span + 1.0)
+    out = np.full(values.shape, np.nan)
+    state = np.full(values.shape[1], np.nan)
+    for t, row in enumerate(values):
+        state = np.where(np.isnan(state), row, alpha * row + (1 - alpha) * state)
+        out[t] = state
+    return out
+
+
+def rolling_bb_width(close, window=BB_WINDOW):
+    """Bollinger band width % for every full window, shape (bars - window + 1) x tickers"""
+    if close.shape[0] < window:
+        return np.full((0, close.shape[1]), np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(close, window, axis=0)
+    sma = windows.mean(axis=-1)
+    std = windows.std(axis=-1, ddof=1)
+    return ((sma + 2 * std) - (sma - 2 * std)) / sma * 100
+
+
+def compute_indicators(panels):
+    """
+    One row per ticker with the indicators behind get_comprehensive_stock_data.
+    breakout_base is the breakout score before the info-based short-ratio
+    point, which the caller adds.
+    """
+    tickers, aligned = right_align(panels)
+    close, high, low, volume = aligned["Close"], aligned["High"], aligned["Low"], aligned["Volume"]
+    n_bars = np.sum(~np.isnan(close), axis=0)
+
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        current = _bar(close, 1)
+        previous = np.where(n_bars >= 2, _bar(close, 2), current)
+        close_5 = _bar(close, 6)
+        close_30 = _bar(close, 31)
+
+        avg_volume_20 = _nanmean(volume[-20:])
+        avg_volume_5 = _nanmean(volume[-5:])
+        current_volume = _bar(volume, 1)
+
+        returns = close[1:] / close[:-1] - 1
+        high_52w = np.nanmax(high, axis=0) if high.shape[0] else np.full(high.shape[1], np.nan)
+        low_52w = np.nanmin(low, axis=0) if low.shape[0] else np.full(low.shape[1], np.nan)
+
+        # RSI: simple means of the last 14 gains and losses; a ticker's first bar counts as no change
+        delta = np.diff(close, axis=0, prepend=np.nan)
+        bars = ~np.isnan(close)
+        gains = np.where(bars, np.where(delta > 0, delta, 0.0), np.nan)
+        losses = np.where(bars, np.where(delta < 0, -delta, 0.0), np.nan)
+        if close.shape[0] >= RSI_WINDOW:
+            rs = gains[-RSI_WINDOW:].mean(axis=0) / losses[-RSI_WINDOW:].mean(axis=0)
+        else:
+            rs = np.full(close.shape[1], np.nan)
+        rsi = 100 - (100 / (1 + rs))
+
+        macd_line = ema(close, MACD_FAST) - ema(close, MACD_SLOW)
+        signal_line = ema(macd_line, MACD_SIGNAL)
+        macd = np.round(_bar(macd_line, 1), 4)
+        macd_signal = np.round(_bar(signal_line, 1), 4)
+        macd_hist = np.round(_bar(macd_line - signal_line, 1), 4)
+
+        widths = rolling_bb_width(close)
+        bb_width = _bar(widths, 1)
+        width_count = np.sum(~np.isnan(widths), axis=0)
+        width_q25 = np.nanquantile(widths, 0.25, axis=0) if widths.shape[0] else np.full(close.shape[1], np.nan)
+
+        table = pd.DataFrame({
+            "n_bars": n_bars,
+            "current_price": current,
+            "previous_close": previous,
+            "daily_change_pct": (current - previous) / previous * 100,
+            "five_day_change_pct": np.where(n_bars >= 6, (current - close_5) / close_5 * 100, 0.0),
+            "thirty_day_change_pct": np.where(n_bars >= 31, (current - close_30) / close_30 * 100, 0.0),
+            "current_volume": current_volume,
+            "avg_volume_20d": avg_volume_20,
+            "volume_ratio": np.where(avg_volume_20 > 0, current_volume / avg_volume_20, 1.0),
+            "volatility_annual_pct": _nanstd(returns) * (252 ** 0.5) * 100,
+            "fifty_two_week_high": high_52w,
+            "fifty_two_week_low": low_52w,
+            "rsi_14": rsi,
+            "macd": macd,
+            "macd_signal": macd_signal,
+            "macd_histogram": macd_hist,
+            "bb_width_pct": bb_width,
+            "bb_width_q25": width_q25,
+            "sma_20": _nanmean(close[-20:]),
+            "sma_50": _nanmean(close[-50:]),
+            "vol_5d_avg": avg_volume_5,
+        }, index=tickers)
+
+        squeeze = ~np.isnan(bb_width) & (width_count >= BB_MIN_HISTORY) & (bb_width <= width_q25)
+        volume_building = (n_bars >= 20) & (avg_volume_20 > 0) & (avg_volume_5 / avg_volume_20 >= 1.5)
+        near_high = (n_bars > 0) & (high_52w > 0) & (current / high_52w >= 0.85)
+        table["breakout_base"] = (
+            2 * ((rsi >= 40) & (rsi <= 65))
+            + 2 * squeeze
+            + 2 * (macd_hist > 0)
+            + 2 * volume_building
+            + 1 * near_high
+        )
+    return table
+
+
+# Streaming state: the same indicators updated one bar at a time in O(1),
+# for live refreshes without rebuilding frames. Every class round-trips
+# through state()/from_state() as plain JSON-able values.
+
+class StreamingEMA:
+    """pandas ewm(span, adjust=False): the first value seeds the average"""
+
+    def __init__(self, span, value=None):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+
+    def update(self, x):
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def state(self):
+        return {"span": self.span, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["span"], state["value"])
+
+
+class WilderRSI:
+    """
+    Wilder's RSI: the first average gain/loss is the simple mean of the
+    first `window` changes, later ones are smoothed by (window - 1) / window.
+    None until `window` changes have been seen.
+    """
+
+    def __init__(self, window=RSI_WINDOW):
+        self.window = window
+        self.last_close = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close):
+        if self.last_close is not None:
+            change = close - self.last_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.count += 1
+            if self.count <= self.window:
+                # Running mean until the seed window is full
+                self.avg_gain += (gain - self.avg_gain) / self.count
+                self.avg_loss += (loss - self.avg_loss) / self.count
+            else:
+                self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+                self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+        self.last_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return None
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else 50.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def state(self):
+        return {"window": self.window, "last_close": self.last_close, "count": self.count,
+                "avg_gain": self.avg_gain, "avg_loss": self.avg_loss}
+
+    @classmethod
+    def from_state(cls, state):
+        rsi = cls(state["window"])
+        rsi.last_close, rsi.count = state["last_close"], state["count"]
+        rsi.avg_gain, rsi.avg_loss = state["avg_gain"], state["avg_loss"]
+        return rsi
+
+
+class RollingWindow:
+    """Mean and sample standard deviation of the last `size` values from a running sum and sum of squares"""
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        for x in values:
+            self.update(x)
+
+    def update(self, x):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else None
+
+    @property
+    def std(self):
+        n = len(self.values)
+        if n < 2:
+            return None
+        # Clamp: subtracting running sums can leave a tiny negative variance
+        return max((self.total_sq - self.total * self.total / n) / (n - 1), 0.0) ** 0.5
+
+    def state(self):
+        # The window itself is the state; sums are rebuilt from it, which also clears rounding drift
+        return {"size": self.size, "values": list(self.values)}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["size"], state["values"])
+
+
+class RollingRSI:
+    """
+    compute_indicators' rsi_14: simple means of the last `window` gains and
+    losses, the first bar counting as no change. None until `window` bars
+    have been seen, and when the window has neither gains nor losses.
+    """
+
+    def __init__(self, window=RSI_WINDOW, last_close=None, gains=(), losses=()):
+        self.window = window
+        self.last_close = last_close
+        self.gains = RollingWindow(window, gains)
+        self.losses = RollingWindow(window, losses)
+
+    def update(self, close):
+        change = 0.0 if self.last_close is None else close - self.last_close
+        self.gains.update(max(change, 0.0))
+        self.losses.update(max(-change, 0.0))
+        self.last_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if not self.gains.full:
+            return None
+        gain, loss = self.gains.mean, self.losses.mean
+        if loss <= 0:
+            return 100.0 if gain > 0 else None
+        return 100 - 100 / (1 + gain / loss)
+
+    def state(self):
+        return {"window": self.window, "last_close": self.last_close,
+                "gains": list(self.gains.values), "losses": list(self.losses.values)}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["window"], state["last_close"], state["gains"], state["losses"])
+
+
+class StreamingIndicators:
+    """
+    One ticker's live indicators, fed a bar at a time with update(). Bars at
+    or before the last one seen are ignored, so re-feeding an overlapping
+    download is harmless. snapshot() uses compute_indicators' column names
+    and values; Wilder's smoothed RSI is added as rsi_wilder_14.
+    """
+
+    def __init__(self):
+        self.last_bar = None
+        self.previous_close = None
+        self.close = None
+        self.volume = None
+        self.ema_fast = StreamingEMA(MACD_FAST)
+        self.ema_slow = StreamingEMA(MACD_SLOW)
+        self.macd_signal = StreamingEMA(MACD_SIGNAL)
+        self.rsi = RollingRSI()
+        self.rsi_wilder = WilderRSI()
+        self.close_20 = RollingWindow(BB_WINDOW)
+        self.close_50 = RollingWindow(50)
+        self.volume_20 = RollingWindow(20)
+        self.volume_5 = RollingWindow(5)
+
+    def update(self, timestamp, close, volume):
+        """Add one completed bar. Returns False if it was not newer than the last."""
+        if not isinstance(timestamp, str):
+            timestamp = pd.Timestamp(timestamp).isoformat()
+        if self.last_bar is not None and timestamp <= self.last_bar:
+            return False
+        self.last_bar = timestamp
+        self.previous_close, self.close, self.volume = self.close, close, volume
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        self.macd_signal.update(macd)
+        self.rsi.update(close)
+        self.rsi_wilder.update(close)
+        self.close_20.update(close)
+        self.close_50.update(close)
+        self.volume_20.update(volume)
+        self.volume_5.update(volume)
+        return True
+
+    def seed(self, hist):
+        """Feed a history frame (Close and Volume columns, date index) bar by bar"""
+        for timestamp, row in hist.dropna(subset=["Close"]).iterrows():
+            self.update(timestamp, float(row["Close"]), float(row["Volume"]))
+        return self
+
+    def snapshot(self):
+        if self.close is None:
+            return {}
+        macd = self.ema_fast.value - self.ema_slow.value
+        sma_20, std_20 = self.close_20.mean, self.close_20.std
+        avg_volume = self.volume_20.mean
+        return {
+            "last_bar": self.last_bar,
+            "current_price": self.close,
+            # A first bar is its own previous close, as in compute_indicators
+            "previous_close": self.close if self.previous_close is None else self.previous_close,
+            "current_volume": self.volume,
+            "avg_volume_20d": avg_volume,
+            "volume_ratio": self.volume / avg_volume if avg_volume else 1.0,
+            "vol_5d_avg": self.volume_5.mean,
+            "rsi_14": self.rsi.value,
+            "rsi_wilder_14": self.rsi_wilder.value,
+            "macd": round(macd, 4),
+            "macd_signal": round(self.macd_signal.value, 4),
+            "macd_histogram": round(macd - self.macd_signal.value, 4),
+            "sma_20": sma_20,
+            "sma_50": self.close_50.mean,
+            "bb_width_pct": 4 * std_20 / sma_20 * 100 if self.close_20.full and sma_20 else None,
+        }
+
+    def state(self):
+        return {
+            "last_bar": self.last_bar,
+            "previous_close": self.previous_close,
+            "close": self.close,
+            "volume": self.volume,
+            "ema_fast": self.ema_fast.state(),
+            "ema_slow": self.ema_slow.state(),
+            "macd_signal": self.macd_signal.state(),
+            "rsi": self.rsi.state(),
+            "rsi_wilder": self.rsi_wilder.state(),
+            "close_20": self.close_20.state(),
+            "close_50": self.close_50.state(),
+            "volume_20": self.volume_20.state(),
+            "volume_5": self.volume_5.state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        indicators = cls()
+        indicators.last_bar = state["last_bar"]
+        indicators.previous_close, indicators.close, indicators.volume = (
+            state["previous_close"], state["close"], state["volume"])
+        indicators.ema_fast = StreamingEMA.from_state(state["ema_fast"])
+        indicators.ema_slow = StreamingEMA.from_state(state["ema_slow"])
+        indicators.macd_signal = StreamingEMA.from_state(state["macd_signal"])
+        indicators.rsi = RollingRSI.from_state(state["rsi"])
+        indicators.rsi_wilder = WilderRSI.from_state(state["rsi_wilder"])
+        for name in ("close_20", "close_50", "volume_20", "volume_5"):
+            setattr(indicators, name, RollingWindow.from_state(state[name]))
+        return indicators
+
+
+class IndicatorBook:
+    """StreamingIndicators for a whole watchlist, checkpointed to one JSON file"""
+
+    def __init__(self, tickers=None):
+        self.tickers = tickers if tickers is not None else {}
+
+    def __getitem__(self, ticker):
+        if ticker not in self.tickers:
+            self.tickers[ticker] = StreamingIndicators()
+        return self.tickers[ticker]
+
+    def __contains__(self, ticker):
+        return ticker in self.tickers
+
+    def reset(self, tickers):
+        """Forget these tickers' state so the next bars fed reseed them"""
+        for ticker in tickers:
+            self.tickers.pop(ticker, None)
+
+    def update_bars(self, bars):
+        """
+        Feed the new bars from a multi-ticker frame (yf.download group_by
+        "column" layout: field then ticker columns) or PriceStore.panels.
+        Returns the number of bars applied.
+        """
+        closes = bars["Close"]
+        volumes = bars["Volume"].reindex(index=closes.index, columns=closes.columns).fillna(0.0)
+        states = [self[ticker] for ticker in closes.columns]
+        applied = 0
+        for timestamp, close_row, volume_row in zip(closes.index, closes.to_numpy(dtype=float),
+                                                    volumes.to_numpy(dtype=float)):
+            timestamp = pd.Timestamp(timestamp).isoformat()
+            for indicators, close, volume in zip(states, close_row.tolist(), volume_row.tolist()):
+                if close == close:
+                    applied += indicators.update(timestamp, close, volume)
+        return applied
+
+    def snapshot(self):
+        return {ticker: indicators.snapshot() for ticker, indicators in self.tickers.items()}
+
+    def save(self, path=CHECKPOINT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({ticker: indicators.state() for ticker, indicators in self.tickers.items()},
+                      f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CHECKPOINT_PATH):
+        """The saved book, or an empty one if there is no checkpoint yet"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return cls({ticker: StreamingIndicators.from_state(state) for ticker, state in saved.items()})
+
+
+# Columns the streaming snapshot shares with compute_indicators over the same
+# bars. MACD is left out: its EMAs start wherever the stream started.
+STREAMED_COLUMNS = ("current_price", "previous_close", "rsi_14", "sma_20", "sma_50",
+                    "avg_volume_20d", "vol_5d_avg", "bb_width_pct")
+
+
+def disagreements(book, table, columns=STREAMED_COLUMNS, rtol=1e-6):
+    """
+    Tickers in a compute_indicators table whose streamed values differ from
+    its row (or that the book has not seen), e.g. after a split rebackfill
+    or a revised last bar.
+    """
+    differ = []
+    for ticker in table.index[table["n_bars"] > 0]:
+        snapshot = book.tickers[ticker].snapshot() if ticker in book else {}
+        expected = table.loc[ticker, list(columns)].to_numpy(dtype=float)
+        streamed = np.array([np.nan if snapshot.get(c) is None else snapshot[c] for c in columns], dtype=float)
+        if not np.allclose(streamed, expected, rtol=rtol, atol=1e-9, equal_nan=True):
+            differ.append(ticker)
+    return differ
@@ -0,0 +1,71 @@
+# coding: utf-8
+"""
+Persistent cache of Yahoo `Ticker.info` snapshots, so restarts and same-day
+re-runs reuse the last payload instead of refetching it. Daily bars live in
+the price store; together they cover everything get_comprehensive_stock_data
+downloads.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlite_store import connect, init_store
+
+DEFAULT_PATH = os.getenv("INFO_CACHE_PATH", os.path.join("data", "yahoo_info.sqlite"))
+# Snapshots younger than this are served without asking Yahoo
+MAX_AGE = timedelta(hours=float(os.getenv("INFO_CACHE_MAX_AGE_HOURS", "24")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    ticker TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class InfoCache:
+    def __init__(self, path=DEFAULT_PATH, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        init_store(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def lookup(self, ticker):
+        """(info, fetched_at) for the saved snapshot, or (None, None)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, fetched_at FROM info WHERE ticker = ?", (ticker,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), datetime.fromisoformat(row[1])
+
+    def store(self, ticker, info, fetched_at=None):
+        fetched_at = fetched_at or datetime.now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO info (ticker, fetched_at, payload) VALUES (?, ?, ?)",
+                (ticker, fetched_at.isoformat(), json.dumps(info, default=str))
+            )
+
+    def get(self, ticker, fetch, max_age=None):
+        """
+        The saved snapshot if younger than max_age, otherwise fetch()'s result,
+        which is saved. If fetch() fails and an older snapshot exists, that
+        snapshot is returned instead.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        info, fetched_at = self.lookup(ticker)
+        if info is not None and datetime.now() - fetched_at < max_age:
+            return info
+        try:
+            fresh = fetch()
+        except Exception:
+            if info is not None:
+                return info
+            raise
+        if fresh:
+            self.store(ticker, fresh)
+            return fresh
+        return info if info is not None else fresh
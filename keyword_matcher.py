@@ -0,0 +1,80 @@
+# coding: utf-8
+"""Single-pass multi-phrase matcher (Aho-Corasick) for the weighted keyword tables."""
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Compiles several phrase tables into one automaton. Tables map a category
+    name to either {phrase: weight} or an iterable of phrases (weight None).
+    Matching is case-insensitive substring matching, the same as `phrase in
+    text.lower()`, and each phrase is reported once per text.
+    """
+
+    def __init__(self, tables):
+        # patterns[i] = (category, phrase, weight); ids follow table insertion order
+        self.patterns = []
+        for category, table in tables.items():
+            items = table.items() if isinstance(table, dict) else ((phrase, None) for phrase in table)
+            for phrase, weight in items:
+                self.patterns.append((category, phrase.lower(), weight))
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        outputs = [[]]
+        for pattern_id, (_, phrase, _) in enumerate(self.patterns):
+            state = 0
+            for ch in phrase:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(pattern_id)
+
+        # Breadth-first pass: failure links, merged outputs and a full transition
+        # table over the phrase alphabet so matching never walks failure links
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+
+        self._delta = delta
+        self._outputs = [tuple(ids) for ids in outputs]
+
+    def match_ids(self, text):
+        """Set of pattern ids found in text, in one pass over the characters"""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text.lower():
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def find(self, text):
+        """Every (category, phrase, weight) hit in text, in table order"""
+        return [self.patterns[i] for i in sorted(self.match_ids(text))]
+
+    def find_many(self, texts):
+        """find() over a sequence of texts; repeated texts are only scanned once"""
+        seen = {}
+        results = []
+        for text in texts:
+            hits = seen.get(text)
+            if hits is None:
+                hits = seen[text] = self.find(text)
+            results.append(hits)
+        return results
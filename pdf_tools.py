@@ -0,0 +1,107 @@
+# coding: utf-8
+"""
+Announcement PDFs in memory: a streamed download with a hard size cap, and
+optional page trimming so long reports send Gemini only the pages that
+matter (the opening pages plus any page that looks like a financial table).
+
+Trimming needs pypdf; without it PDFs are sent whole.
+"""
+import io
+import os
+import re
+
+import requests
+
+# Gemini rejects inline requests over 20 MB; leave room for the prompt
+MAX_PDF_BYTES = int(os.getenv("PDF_MAX_BYTES", str(18 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Trim PDFs longer than TRIM_ABOVE pages to the first TRIM_FIRST_PAGES plus
+# financial-table pages, at most TRIM_MAX_PAGES in all. PDF_TRIM_PAGES=0 disables.
+TRIM_FIRST_PAGES = int(os.getenv("PDF_TRIM_PAGES", "10"))
+TRIM_ABOVE = int(os.getenv("PDF_TRIM_ABOVE", "20"))
+TRIM_MAX_PAGES = int(os.getenv("PDF_TRIM_MAX_PAGES", "25"))
+
+FINANCIAL_TABLE_RE = re.compile(
+    r"statement of (?:financial position|profit or loss|comprehensive income|cash flows?)"
+    r"|balance sheet|income statement|cash ?flow statement|segment (?:information|results)"
+    r"|\b(?:revenue|ebitda|ebit|npat|net profit|underlying earnings|earnings per share|free cash flow)\b"
+    r"|\$ ?'000|\$ ?m\b|a\$m\b|\$ ?million",
+    re.IGNORECASE,
+)
+NUMBER_RE = re.compile(r"\(?-?\$?\d[\d,]*(?:\.\d+)?\)?%?")
+# A table page mentions a financial term and is dense with figures
+MIN_TABLE_NUMBERS = 40
+
+
+class PdfTooLarge(Exception):
+    pass
+
+
+def download_pdf(url, session=None, max_bytes=MAX_PDF_BYTES, timeout=30):
+    """
+    The PDF's bytes, streamed in chunks. Raises PdfTooLarge as soon as the
+    Content-Length or the bytes received pass max_bytes.
+    """
+    http = session or requests
+    with http.get(url, headers=HEADERS, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise PdfTooLarge(f"{url} is {int(length) // 1024}KB (limit {max_bytes // 1024}KB)")
+        chunks = []
+        received = 0
+        for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+            received += len(chunk)
+            if received > max_bytes:
+                raise PdfTooLarge(f"{url} passed {max_bytes // 1024}KB while downloading")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def is_financial_table(text):
+    return bool(FINANCIAL_TABLE_RE.search(text)) and len(NUMBER_RE.findall(text)) >= MIN_TABLE_NUMBERS
+
+
+def trim_pdf(pdf_bytes, first_pages=TRIM_FIRST_PAGES, above=TRIM_ABOVE, max_pages=TRIM_MAX_PAGES):
+    """
+    (bytes, pages kept, total pages). PDFs of at most `above` pages, or any
+    that cannot be read, come back unchanged (total pages is None when
+    unknown). Longer ones keep the first `first_pages` pages and then
+    financial-table pages in order, up to `max_pages`.
+    """
+    if not first_pages:
+        return pdf_bytes, None, None
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        return pdf_bytes, None, None
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        if reader.is_encrypted:
+            return pdf_bytes, None, None
+        total = len(reader.pages)
+        if total <= above:
+            return pdf_bytes, total, total
+
+        keep = list(range(min(first_pages, total)))
+        for number in range(len(keep), total):
+            if len(keep) >= max_pages:
+                break
+            if is_financial_table(reader.pages[number].extract_text() or ""):
+                keep.append(number)
+
+        writer = PdfWriter()
+        for number in keep:
+            writer.add_page(reader.pages[number])
+        out = io.BytesIO()
+        writer.write(out)
+    except Exception:
+        # A PDF pypdf cannot parse is still worth sending whole
+        return pdf_bytes, None, None
+    trimmed = out.getvalue()
+    if len(trimmed) >= len(pdf_bytes):
+        return pdf_bytes, total, total
+    return trimmed, len(keep), total
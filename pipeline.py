@@ -0,0 +1,137 @@
+# coding: utf-8
+"""
+A small producer/consumer pipeline: each stage has its own worker threads
+and hands items to the next through a bounded queue, so a slow stage
+throttles the ones before it instead of letting work pile up in memory.
+"""
+import queue
+import threading
+import time
+
+QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+class Stage:
+    """
+    fn(item) returns the item for the next stage, or None to drop it. Given a
+    batch_size, fn instead gets a list of up to batch_size items (whatever
+    arrives within batch_wait seconds of the first) and returns a list.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=None, batch_wait=0.0):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy, 2),
+        }
+
+
+def _take(inbox, stage):
+    """The next item, or the next batch for a batching stage. (items, saw_done)"""
+    first = inbox.get()
+    if first is _DONE:
+        return [], True
+    items = [first]
+    deadline = time.monotonic() + stage.batch_wait
+    while len(items) < (stage.batch_size or 1):
+        try:
+            item = inbox.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            break
+        if item is _DONE:
+            return items, True
+        items.append(item)
+    return items, False
+
+
+def run_pipeline(items, stages, queue_size=QUEUE_SIZE, on_output=None, logger=None):
+    """
+    Push items through the stages and return the last stage's outputs in
+    completion order. on_output(item) is called as each one arrives. A
+    stage error is logged and drops that item (or batch) only.
+    """
+    inboxes = [queue.Queue(maxsize=queue_size) for _ in stages] + [queue.Queue()]
+    remaining = [stage.workers for stage in stages]
+    remaining_lock = threading.Lock()
+
+    def finish(index):
+        # The last worker of a stage to stop tells every worker of the next one
+        with remaining_lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            next_workers = stages[index + 1].workers if index + 1 < len(stages) else 1
+            for _ in range(next_workers):
+                inboxes[index + 1].put(_DONE)
+
+    def work(index, stage):
+        inbox, outbox = inboxes[index], inboxes[index + 1]
+        while True:
+            batch, done = _take(inbox, stage)
+            if batch:
+                started = time.perf_counter()
+                failed = False
+                try:
+                    results = stage.fn(batch) if stage.batch_size else [stage.fn(batch[0])]
+                except Exception as e:
+                    results, failed = [], True
+                    if logger is not None:
+                        logger.error(f"Pipeline stage {stage.name} failed: {e}")
+                kept = [result for result in results if result is not None]
+                with stage._lock:
+                    stage.busy += time.perf_counter() - started
+                    stage.processed += len(kept)
+                    if failed:
+                        stage.errors += len(batch)
+                    else:
+                        stage.dropped += max(len(batch) - len(kept), 0)
+                for result in kept:
+                    outbox.put(result)
+            if done:
+                finish(index)
+                return
+
+    threads = [
+        threading.Thread(target=work, args=(index, stage), daemon=True, name=f"{stage.name}-{n}")
+        for index, stage in enumerate(stages)
+        for n in range(stage.workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def feed():
+        for item in items:
+            inboxes[0].put(item)
+        for _ in range(stages[0].workers):
+            inboxes[0].put(_DONE)
+
+    feeder = threading.Thread(target=feed, daemon=True, name="pipeline-feed")
+    feeder.start()
+
+    outputs = []
+    while True:
+        result = inboxes[-1].get()
+        if result is _DONE:
+            break
+        outputs.append(result)
+        if on_output is not None:
+            on_output(result)
+    for thread in threads:
+        thread.join()
+    return outputs
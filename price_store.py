@@ -0,0 +1,220 @@
+# coding: utf-8
+"""Local daily OHLCV store for the watchlist, updated incrementally from Yahoo."""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from sqlite_store import connect, init_store
+
+DEFAULT_PATH = os.getenv("PRICE_STORE_PATH", os.path.join("data", "prices.sqlite"))
+BACKFILL_PERIOD = "1y"
+# Tickers fetched more recently than this are not refetched
+REFRESH_AFTER = timedelta(minutes=float(os.getenv("PRICE_REFRESH_MINUTES", "60")))
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+# A finished bar's adjusted close moving by more than this means a split or dividend
+ADJUSTMENT_TOLERANCE = 1e-4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetch_log (
+    ticker TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL
+);
+"""
+
+
+class PriceStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._update_lock = threading.Lock()
+        init_store(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def _stale_tickers(self, conn, tickers):
+        cutoff = (datetime.now() - REFRESH_AFTER).isoformat()
+        fresh = {
+            row[0] for row in conn.execute("SELECT ticker FROM fetch_log WHERE fetched_at >= ?", (cutoff,))
+        }
+        return [t for t in tickers if t not in fresh]
+
+    def update(self, tickers):
+        """
+        Append the bars each ticker is missing. Tickers are grouped by their
+        second-to-last stored date so a normal run is one small multi-ticker
+        download; new tickers are backfilled with BACKFILL_PERIOD. The last
+        stored bar is refetched in case it was a partial session.
+
+        Bars are split/dividend adjusted, so an adjustment changes every past
+        close. The refetched bar before the last one is a finished session: if
+        its close no longer matches the stored one, the ticker's history is
+        replaced with a fresh backfill so all of it shares one price basis.
+        Only tickers whose download succeeded are marked as fetched.
+        Returns the number of rows written.
+        """
+        tickers = sorted(set(tickers))
+        with self._update_lock, self._connect() as conn:
+            stale = self._stale_tickers(conn, tickers)
+            if not stale:
+                return 0
+
+            last_dates = dict(conn.execute("SELECT ticker, MAX(date) FROM prices GROUP BY ticker"))
+            check_dates = dict(conn.execute(
+                "SELECT p.ticker, MAX(p.date) FROM prices p "
+                "WHERE p.date < (SELECT MAX(date) FROM prices WHERE ticker = p.ticker) GROUP BY p.ticker"
+            ))
+            groups = {}
+            for ticker in stale:
+                start = check_dates.get(ticker) or last_dates.get(ticker)
+                groups.setdefault(start, []).append(ticker)
+
+            written = 0
+            fetched = []
+            rebase = []
+            for start, group in groups.items():
+                try:
+                    data = self._download(group, start)
+                except Exception as e:
+                    print(f"Price store download failed for {len(group)} tickers: {e}")
+                    continue
+                if start is not None:
+                    changed = self._adjusted_since(conn, data, group, start)
+                    rebase.extend(changed)
+                    group = [ticker for ticker in group if ticker not in changed]
+                    data = data.loc[:, data.columns.get_level_values(1).isin(group)] if not data.empty else data
+                written += self._write(conn, data)
+                fetched.extend(group)
+
+            if rebase:
+                print(f"Price basis changed for {len(rebase)} tickers (split or dividend); backfilling")
+                try:
+                    data = self._download(rebase, None)
+                except Exception as e:
+                    print(f"Price store backfill failed for {len(rebase)} tickers: {e}")
+                else:
+                    conn.executemany("DELETE FROM prices WHERE ticker = ?", [(ticker,) for ticker in rebase])
+                    written += self._write(conn, data)
+                    fetched.extend(rebase)
+
+            fetched_at = datetime.now().isoformat()
+            conn.executemany(
+                "INSERT OR REPLACE INTO fetch_log (ticker, fetched_at) VALUES (?, ?)",
+                [(ticker, fetched_at) for ticker in fetched]
+            )
+            return written
+
+    def _download(self, tickers, start):
+        if start is None:
+            return yf.download(tickers, period=BACKFILL_PERIOD, group_by="column", auto_adjust=True,
+                               progress=False, multi_level_index=True)
+        return yf.download(tickers, start=start, group_by="column", auto_adjust=True,
+                           progress=False, multi_level_index=True)
+
+    def _adjusted_since(self, conn, data, tickers, date):
+        """Tickers whose downloaded close for date differs from the stored one"""
+        if data is None or data.empty or "Close" not in data.columns.get_level_values(0):
+            return []
+        closes = data["Close"]
+        stamp = pd.Timestamp(date)
+        if stamp not in closes.index:
+            return []
+        placeholders = ",".join("?" * len(tickers))
+        stored = dict(conn.execute(
+            f"SELECT ticker, close FROM prices WHERE date = ? AND ticker IN ({placeholders})",
+            [date, *tickers]
+        ))
+        changed = []
+        for ticker in tickers:
+            old = stored.get(ticker)
+            new = closes.at[stamp, ticker] if ticker in closes.columns else None
+            if old is None or new is None or pd.isna(new) or not old:
+                continue
+            if abs(float(new) - old) / abs(old) > ADJUSTMENT_TOLERANCE:
+                changed.append(ticker)
+        return changed
+
+    def _write(self, conn, data):
+        if data is None or data.empty:
+            return 0
+        long = data[FIELDS].stack(level=1, future_stack=True).dropna(subset=["Close"])
+        rows = [
+            (ticker, date.strftime("%Y-%m-%d"), *(None if pd.isna(v) else float(v) for v in values))
+            for (date, ticker), values in zip(long.index, long[FIELDS].itertuples(index=False))
+        ]
+        conn.executemany(
+            "INSERT OR REPLACE INTO prices (ticker, date, open, high, low, close, volume) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return len(rows)
+
+    def history(self, ticker, days=None, bars=None):
+        """
+        Daily bars for one ticker, shaped like yf.Ticker.history(): a date index
+        and Open/High/Low/Close/Volume columns. Limit by calendar days or by
+        the last N bars.
+        """
+        query = "SELECT date, open, high, low, close, volume FROM prices WHERE ticker = ?"
+        params = [ticker]
+        if days is not None:
+            query += " AND date >= ?"
+            params.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"))
+        query += " ORDER BY date"
+        with self._connect() as conn:
+            hist = pd.read_sql_query(query, conn, params=params, parse_dates=["date"], index_col="date")
+        hist.columns = FIELDS
+        if bars is not None:
+            hist = hist.tail(bars)
+        return hist
+
+    def panel(self, tickers, field, days=None, until=None):
+        """
+        One field for many tickers as a date x ticker frame. until (a date or
+        YYYY-MM-DD) keeps only bars before that day, and days then counts back
+        from it instead of from now.
+        """
+        tickers = sorted(set(tickers))
+        column = field.lower()
+        if column not in {f.lower() for f in FIELDS}:
+            raise ValueError(f"Unknown price field: {field}")
+        end = datetime.now() if until is None else pd.Timestamp(until).to_pydatetime()
+        placeholders = ",".join("?" * len(tickers))
+        query = f"SELECT date, ticker, {column} AS value FROM prices WHERE ticker IN ({placeholders})"
+        params = list(tickers)
+        if days is not None:
+            query += " AND date >= ?"
+            params.append((end - timedelta(days=days)).strftime("%Y-%m-%d"))
+        if until is not None:
+            query += " AND date < ?"
+            params.append(end.strftime("%Y-%m-%d"))
+        with self._connect() as conn:
+            long = pd.read_sql_query(query, conn, params=params, parse_dates=["date"])
+        return long.pivot(index="date", columns="ticker", values="value").reindex(columns=tickers).sort_index()
+
+    def panels(self, tickers, days=None):
+        """{field: date x ticker frame} for every OHLCV field from one query"""
+        tickers = sorted(set(tickers))
+        placeholders = ",".join("?" * len(tickers))
+        query = (f"SELECT date, ticker, open, high, low, close, volume FROM prices "
+                 f"WHERE ticker IN ({placeholders})")
+        params = list(tickers)
+        if days is not None:
+            query += " AND date >= ?"
+            params.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"))
+        with self._connect() as conn:
+            long = pd.read_sql_query(query, conn, params=params, parse_dates=["date"])
+        long.columns = ["date", "ticker"] + FIELDS
+        return {
+            field: long.pivot(index="date", columns="ticker", values=field).reindex(columns=tickers).sort_index()
+            for field in FIELDS
+        }
@@ -0,0 +1,150 @@
+# coding: utf-8
+"""
+Replay the N2.py filter and scoring pipeline over past days.
+
+    python replay.py --since 2025-01-01 --until 2025-12-31            # archived announcement rows
+    python replay.py --source snapshots data/snapshots/*.html.gz      # saved todayAnns.do pages
+    python replay.py --since 2025-06-01 --top-k 10 --workers 8
+
+Days are scored independently in a process pool. Volume buildup is read
+from the local price store as it stood before each day, and nothing is
+fetched from the network. Writes one CSV of the top-K announcements per day
+and one of the per-filter counts per day.
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import N2
+from announcement_archive import DEFAULT_PATH as ARCHIVE_PATH, AnnouncementArchive
+from asx_announcements import SNAPSHOT_DIR, parse_announcements, read_snapshot_html
+
+_SNAPSHOT_DATE_RE = re.compile(r"todayAnns_(\d{4})(\d{2})(\d{2})_")
+
+PICK_FIELDS = ["day", "rank", "ticker", "date_time", "title", "sentiment_score", "volume_buildup"]
+
+
+def snapshot_days(paths):
+    """{YYYY-MM-DD: [paths]} from todayAnns_YYYYMMDD_HHMMSS page filenames"""
+    days = {}
+    for path in sorted(paths):
+        match = _SNAPSHOT_DATE_RE.search(os.path.basename(path))
+        if match:
+            days.setdefault("-".join(match.groups()), []).append(path)
+    return days
+
+
+def rows_from_snapshots(paths):
+    """Rows across a day's saved pages; watch mode saves several, so repeats are dropped"""
+    rows = {}
+    for path in paths:
+        for row in parse_announcements(read_snapshot_html(path)) or []:
+            rows.setdefault(N2.announcement_key(row), row)
+    return list(rows.values())
+
+
+def rows_from_archive(archive_path, day):
+    return [
+        {
+            "ticker": record["ticker"],
+            "date_time": datetime.fromisoformat(record["announced_at"]) if record["announced_at"] else None,
+            "price_sensitive": bool(record["price_sensitive"]),
+            "title": record["title"],
+            "landing_url": record["landing_url"],
+        }
+        for record in AnnouncementArchive(archive_path).search(since=day, until=day)
+    ]
+
+
+def replay_day(task):
+    """Worker: score one day. Returns (day, top-K announcements, per-filter counts)."""
+    day, source, top_k = task
+    if isinstance(source, list):
+        rows = rows_from_snapshots(source)
+    else:
+        rows = rows_from_archive(source, day)
+    # Ties keep input order, so fix it to make both sources rank alike
+    rows.sort(key=N2.announcement_key)
+    stats = {}
+    ranked = N2.score_announcements(rows, stats=stats, verbose=False, as_of=day)
+    return day, ranked[:top_k], stats
+
+
+def replay(days, top_k=N2.TOP_N, workers=None):
+    """
+    Score every day in days ({YYYY-MM-DD: archive path or list of page
+    paths}) across a process pool. Returns [(day, top-K, counts)] by day.
+    """
+    tasks = [(day, source, top_k) for day, source in sorted(days.items())]
+    if not tasks:
+        return []
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(replay_day, tasks, chunksize=chunksize))
+
+
+def write_results(results, picks_path, stats_path):
+    with open(picks_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=PICK_FIELDS)
+        writer.writeheader()
+        for day, top, _ in results:
+            for rank, ann in enumerate(top, start=1):
+                writer.writerow({
+                    "day": day,
+                    "rank": rank,
+                    "ticker": ann["ticker"],
+                    "date_time": ann["date_time"].strftime("%d/%m/%Y %H:%M") if ann["date_time"] else "N/A",
+                    "title": ann["title"],
+                    "sentiment_score": ann["sentiment_score"],
+                    "volume_buildup": ann["volume_buildup"],
+                })
+
+    with open(stats_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["day", *N2.FILTER_STAGES])
+        writer.writeheader()
+        for day, _, stats in results:
+            writer.writerow({"day": day, **stats})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the N2 scoring pipeline over past days")
+    parser.add_argument("paths", nargs="*", help=f"saved pages for --source snapshots (default: {SNAPSHOT_DIR}/*)")
+    parser.add_argument("--source", choices=("archive", "snapshots"), default="archive")
+    parser.add_argument("--archive", default=ARCHIVE_PATH, help="announcement archive database")
+    parser.add_argument("--since", help="first day, YYYY-MM-DD")
+    parser.add_argument("--until", help="last day, YYYY-MM-DD")
+    parser.add_argument("--top-k", type=int, default=N2.TOP_N)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--out", default="replay_picks.csv")
+    parser.add_argument("--stats-out", default="replay_stats.csv")
+    args = parser.parse_args()
+
+    if args.source == "archive":
+        days = {day: args.archive for day in AnnouncementArchive(args.archive).dates(args.since, args.until)}
+    else:
+        days = snapshot_days(args.paths or glob.glob(os.path.join(SNAPSHOT_DIR, "*")))
+        days = {day: paths for day, paths in days.items()
+                if (not args.since or day >= args.since) and (not args.until or day <= args.until)}
+
+    started = time.perf_counter()
+    results = replay(days, top_k=args.top_k, workers=args.workers)
+    write_results(results, args.out, args.stats_out)
+
+    totals = dict.fromkeys(N2.FILTER_STAGES, 0)
+    for _, _, stats in results:
+        for stage, count in stats.items():
+            totals[stage] += count
+    print(f"Replayed {len(results)} days in {time.perf_counter() - started:.1f}s")
+    for stage in N2.FILTER_STAGES:
+        print(f"  {stage:<20} {totals[stage]:>8}")
+    print(f"Saved {args.out} and {args.stats_out}")
+
+
+if __name__ == "__main__":
+    main()
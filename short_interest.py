@@ -0,0 +1,190 @@
+# coding: utf-8
+"""
+Market-wide short interest from ASIC's daily aggregated short position report.
+
+One file covers every ASX product, so a run costs one download (or none if
+the day's file is already on disk) and lookups are dictionary hits. Each
+day's raw report is kept so changes can be tracked over time. Set
+SHORT_INTEREST_FILE to load a local stand-in file instead of downloading.
+"""
+import csv
+import io
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+ASIC_URL = "https://download.asic.gov.au/short-selling/RR{date}-001-SSDailyAggShortPos.csv"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+SNAPSHOT_DIR = os.path.join("data", "short_interest")
+# ASIC publishes with a few business days' delay
+MAX_LOOKBACK_DAYS = 10
+# Kept short: the report is fetched on the 9:00 path and an outage should not stall it
+DOWNLOAD_TIMEOUT = 5
+
+_SNAPSHOT_RE = re.compile(r"^(\d{8})\.csv$")
+
+
+def parse_short_positions(content):
+    """Parse an ASIC report (UTF-16 tab-separated or UTF-8 CSV) into {ticker: short %}"""
+    if content.startswith((b"\xff\xfe", b"\xfe\xff")):
+        text = content.decode("utf-16")
+    else:
+        text = content.decode("utf-8-sig", errors="replace")
+    delimiter = "\t" if "\t" in text.split("\n", 1)[0] else ","
+
+    positions = {}
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    header = None
+    for row in reader:
+        row = [cell.strip() for cell in row]
+        if header is None:
+            if any("product code" in cell.lower() for cell in row):
+                header = [cell.lower() for cell in row]
+                code_idx = next(i for i, c in enumerate(header) if "product code" in c)
+                pct_idx = next(i for i, c in enumerate(header) if "%" in c)
+            continue
+        if len(row) <= max(code_idx, pct_idx) or not row[code_idx]:
+            continue
+        try:
+            positions[row[code_idx].upper()] = float(row[pct_idx].replace(",", ""))
+        except ValueError:
+            continue
+    return positions
+
+
+class ShortInterestBook:
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, source_file=None):
+        self.snapshot_dir = snapshot_dir
+        self.source_file = source_file or os.getenv("SHORT_INTEREST_FILE")
+        self.snapshots = {}      # {YYYYMMDD: {ticker: short %}}
+        self.current = {}
+        self.current_date = None
+        self.loaded_on = None    # day of the last ensure_loaded() attempt
+        self._lock = threading.Lock()
+
+    def _snapshot_path(self, date_str):
+        return os.path.join(self.snapshot_dir, f"{date_str}.csv")
+
+    def _saved_dates(self):
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(m.group(1) for m in map(_SNAPSHOT_RE.match, os.listdir(self.snapshot_dir)) if m)
+
+    def _read_saved(self, date_str):
+        if date_str not in self.snapshots:
+            with open(self._snapshot_path(date_str), "rb") as f:
+                self.snapshots[date_str] = parse_short_positions(f.read())
+        return self.snapshots[date_str]
+
+    def _download(self, date_str):
+        """
+        The report for date_str, saved to disk only once it parses, or None
+        if ASIC has not published it (yet). Network failures raise
+        requests.RequestException.
+        """
+        resp = requests.get(ASIC_URL.format(date=date_str), headers=HEADERS, timeout=DOWNLOAD_TIMEOUT)
+        if resp.status_code != 200 or not resp.content:
+            return None
+        positions = parse_short_positions(resp.content)
+        if not positions:
+            # An error page or a body that is not a report: keep trying this date on later runs
+            return None
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with open(self._snapshot_path(date_str), "wb") as f:
+            f.write(resp.content)
+        return positions
+
+    def load(self, as_of=None):
+        """
+        Load the latest report on or before as_of. Only weekdays after the
+        newest saved report are downloaded, newest first, and the first
+        network failure stops the search; otherwise the newest saved report
+        is used. Returns the report date (YYYYMMDD) or None if nothing is
+        available.
+        """
+        with self._lock:
+            if self.source_file:
+                with open(self.source_file, "rb") as f:
+                    self.current = parse_short_positions(f.read())
+                self.current_date = datetime.fromtimestamp(os.path.getmtime(self.source_file)).strftime("%Y%m%d")
+                self.snapshots[self.current_date] = self.current
+                return self.current_date
+
+            as_of = as_of or datetime.now().date()
+            as_of_str = as_of.strftime("%Y%m%d")
+            saved = [d for d in self._saved_dates() if d <= as_of_str]
+            newest_saved = saved[-1] if saved else None
+
+            for offset in range(MAX_LOOKBACK_DAYS + 1):
+                day = as_of - timedelta(days=offset)
+                date_str = day.strftime("%Y%m%d")
+                if newest_saved is not None and date_str <= newest_saved:
+                    break
+                if day.weekday() >= 5:
+                    continue
+                try:
+                    positions = self._download(date_str)
+                except requests.RequestException as e:
+                    print(f"Short interest download failed for {date_str}: {e}")
+                    break
+                if positions:
+                    return self._use(date_str, positions)
+
+            # Newest saved report that parses (older copies may predate the parse check)
+            for date_str in reversed(saved):
+                positions = self._read_saved(date_str)
+                if positions:
+                    return self._use(date_str, positions)
+            return None
+
+    def _use(self, date_str, positions):
+        self.snapshots[date_str] = positions
+        self.current = positions
+        self.current_date = date_str
+        return date_str
+
+    def ensure_loaded(self):
+        """
+        Load at most once a day: a day with no report available is not
+        retried on every lookup, and a long-running process picks up the
+        next day's report.
+        """
+        today = datetime.now().date()
+        if self.loaded_on != today:
+            self.loaded_on = today
+            self.load()
+        return self.current_date
+
+    def get(self, ticker):
+        """Short position as % of issued capital, or None"""
+        return self.current.get(ticker.upper().replace(".AX", ""))
+
+    def format(self, ticker):
+        pct = self.get(ticker)
+        return f"{pct:.2f}%" if pct is not None else "N/A"
+
+    def change(self, ticker):
+        """Change in percentage points versus the previous saved report, or None"""
+        if self.current_date is None:
+            return None
+        earlier = [d for d in self._saved_dates() if d < self.current_date]
+        if not earlier:
+            return None
+        code = ticker.upper().replace(".AX", "")
+        previous = self._read_saved(earlier[-1]).get(code)
+        current = self.current.get(code)
+        if previous is None or current is None:
+            return None
+        return round(current - previous, 2)
+
+    def history(self, ticker):
+        """[(YYYYMMDD, short %)] across every saved report"""
+        code = ticker.upper().replace(".AX", "")
+        return [
+            (date_str, self._read_saved(date_str)[code])
+            for date_str in self._saved_dates()
+            if code in self._read_saved(date_str)
+        ]
@@ -0,0 +1,31 @@
+# coding: utf-8
+"""
+The SQLite plumbing shared by the on-disk stores (prices, Yahoo info,
+announcement archive, analysis cache). Each call opens its own connection,
+which keeps a store safe to use from Flask request threads, and commits or
+rolls back as a transaction.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+def init_store(path, schema):
+    """Create path's directory and apply schema (CREATE ... IF NOT EXISTS statements)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with connect(path) as conn:
+        conn.executescript(schema)
+
+
+@contextmanager
+def connect(path, row_factory=None):
+    conn = sqlite3.connect(path, timeout=30)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
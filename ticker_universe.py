@@ -0,0 +1,222 @@
+# coding: utf-8
+"""
+The watchlist universe shared by N2.py and gem20.py.
+
+value.csv lists the tickers. A daily build adds precomputed attributes:
+sector, industry, biotech flag, market cap and its bucket, and traded value.
+They come from Yahoo and the local price store and are saved to
+data/universe.json, so universe checks and the market-cap and liquidity
+filters are dictionary lookups.
+
+    python ticker_universe.py build         # refresh attributes (once a day)
+    python ticker_universe.py show BHP CBA
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from asx_announcements import SYDNEY_TZ
+
+WATCHLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "value.csv")
+DEFAULT_PATH = os.getenv("TICKER_UNIVERSE_PATH", os.path.join("data", "universe.json"))
+# Sector, industry and share count barely move, so Yahoo is only asked weekly;
+# market cap and liquidity are recomputed from the price store on every build
+INFO_MAX_AGE = timedelta(days=7)
+INFO_WORKERS = 8
+
+# Biotech/Healthcare tickers to EXCLUDE (too volatile). Yahoo's Biotechnology
+# industry is flagged as well once the universe has been built.
+BIOTECH_TICKERS = {
+    "IMU", "PYC", "NEU", "CSL", "RMD", "COH", "SHL",
+    "RHC", "CPU", "DRR", "BOT", "CURE", "DRUG", "HLTH"
+}
+BIOTECH_INDUSTRIES = {"Biotechnology"}
+
+# (upper bound in AUD, bucket name), smallest first
+MARKET_CAP_BUCKETS = [
+    (20e6, "nano"),
+    (300e6, "micro"),
+    (3e9, "small"),
+    (10e9, "mid"),
+    (float("inf"), "large"),
+]
+
+EMPTY_RECORD = {
+    "sector": None,
+    "industry": None,
+    "biotech": False,
+    "shares_outstanding": None,
+    "market_cap": None,
+    "market_cap_bucket": None,
+    "last_traded_value": None,
+    "median_traded_value_20d": None,
+    "info_fetched": None,
+}
+
+
+def ticker_code(ticker):
+    return ticker.strip().upper().replace(".AX", "")
+
+
+def market_cap_bucket(market_cap):
+    if market_cap is None:
+        return None
+    return next(name for bound, name in MARKET_CAP_BUCKETS if market_cap < bound)
+
+
+def read_watchlist(path=WATCHLIST_PATH):
+    """Ticker codes from value.csv's Symbol column, in file order without repeats"""
+    with open(path, encoding="utf-8") as f:
+        codes = [ticker_code(line) for line in f.readlines()[1:] if line.strip()]
+    return list(dict.fromkeys(codes))
+
+
+class TickerUniverse:
+    """
+    Watchlist tickers with their attributes, indexed by ASX code. Lookups
+    accept codes with or without the .AX suffix.
+    """
+
+    def __init__(self, records, built_at=None):
+        self.records = records
+        self.built_at = built_at
+        self.tickers = frozenset(records)
+        self.tickers_ax = frozenset(f"{code}.AX" for code in records)
+        self.biotech_ax = frozenset(f"{code}.AX" for code, record in records.items() if record["biotech"])
+
+    def __contains__(self, ticker):
+        return ticker_code(ticker) in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, ticker):
+        return self.records.get(ticker_code(ticker))
+
+    @property
+    def stale(self):
+        """True unless the attributes were built today (Sydney time)"""
+        if self.built_at is None:
+            return True
+        return datetime.fromisoformat(self.built_at).astimezone(SYDNEY_TZ).date() != datetime.now(SYDNEY_TZ).date()
+
+
+def _read_built(path):
+    if not os.path.exists(path):
+        return None, {}
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    return saved.get("built_at"), saved.get("tickers", {})
+
+
+def load_universe(path=DEFAULT_PATH, watchlist_path=WATCHLIST_PATH):
+    """
+    The universe from value.csv plus the attributes of the last build.
+    Tickers the build has not seen yet get empty attributes.
+    """
+    built_at, saved = _read_built(path)
+    records = {}
+    for code in read_watchlist(watchlist_path):
+        record = dict(EMPTY_RECORD, **saved.get(code, {}))
+        record["biotech"] = record["biotech"] or code in BIOTECH_TICKERS
+        records[code] = record
+    return TickerUniverse(records, built_at)
+
+
+def _fetch_info(code):
+    import yfinance as yf
+
+    try:
+        info = yf.Ticker(f"{code}.AX").info
+    except Exception as e:
+        print(f"Info lookup failed for {code}: {e}")
+        return None
+    return {
+        "sector": info.get("sector"),
+        "industry": info.get("industry"),
+        "shares_outstanding": info.get("sharesOutstanding"),
+        "market_cap": info.get("marketCap"),
+    }
+
+
+def build_universe(path=DEFAULT_PATH, watchlist_path=WATCHLIST_PATH, price_store=None):
+    """
+    Refresh every watchlist ticker's attributes and save them. Yahoo info is
+    fetched only for tickers whose copy is older than INFO_MAX_AGE; prices
+    come from the local store after one batch update.
+    """
+    if price_store is None:
+        from price_store import PriceStore
+        price_store = PriceStore()
+
+    _, saved = _read_built(path)
+    codes = read_watchlist(watchlist_path)
+    now = datetime.now(SYDNEY_TZ)
+
+    due = [
+        code for code in codes
+        if not saved.get(code, {}).get("info_fetched")
+        or now - datetime.fromisoformat(saved[code]["info_fetched"]) > INFO_MAX_AGE
+    ]
+    print(f"Fetching info for {len(due)} of {len(codes)} tickers")
+    with ThreadPoolExecutor(max_workers=INFO_WORKERS) as pool:
+        for code, info in zip(due, pool.map(_fetch_info, due)):
+            if info is not None:
+                saved[code] = dict(saved.get(code, {}), **info, info_fetched=now.isoformat())
+
+    tickers_ax = [f"{code}.AX" for code in codes]
+    price_store.update(tickers_ax)
+    close = price_store.panel(tickers_ax, "Close", days=45)
+    traded = close * price_store.panel(tickers_ax, "Volume", days=45)
+    last_close = close.ffill().iloc[-1] if not close.empty else {}
+    last_traded = traded.ffill().iloc[-1] if not traded.empty else {}
+    median_traded = traded.tail(20).median() if not traded.empty else {}
+
+    def value(series, ticker):
+        number = series.get(ticker)
+        return None if number is None or number != number else float(number)
+
+    records = {}
+    for code, ticker in zip(codes, tickers_ax):
+        record = dict(EMPTY_RECORD, **saved.get(code, {}))
+        price = value(last_close, ticker)
+        if record["shares_outstanding"] and price is not None:
+            record["market_cap"] = record["shares_outstanding"] * price
+        record["market_cap_bucket"] = market_cap_bucket(record["market_cap"])
+        record["last_traded_value"] = value(last_traded, ticker)
+        record["median_traded_value_20d"] = value(median_traded, ticker)
+        record["biotech"] = code in BIOTECH_TICKERS or record["industry"] in BIOTECH_INDUSTRIES
+        records[code] = record
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"built_at": now.isoformat(), "tickers": records}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return TickerUniverse(records, now.isoformat())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watchlist ticker universe")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="refresh attributes for every ticker in value.csv")
+    show_parser = sub.add_parser("show", help="print tickers' attributes")
+    show_parser.add_argument("tickers", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        universe = build_universe()
+        print(f"Built universe of {len(universe)} tickers ({len(universe.biotech_ax)} biotech) to {DEFAULT_PATH}")
+    else:
+        universe = load_universe()
+        print(f"{len(universe)} tickers, built {universe.built_at or 'never'}")
+        for ticker in args.tickers:
+            print(f"{ticker_code(ticker)}: {universe.get(ticker)}")
+
+
+if __name__ == "__main__":
+    main()